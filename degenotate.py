@@ -9,12 +9,14 @@
 
 import sys
 import os
+import signal
 import degenotate_lib.core as CORE
 import degenotate_lib.params as params
 import degenotate_lib.opt_parse as OP
 import degenotate_lib.gxf as gxf
 import degenotate_lib.vcf as vcf
 import degenotate_lib.seq as SEQ
+import degenotate_lib.genome as GENOME
 import degenotate_lib.degen as degen
 import degenotate_lib.output as OUT
 
@@ -26,6 +28,14 @@ if __name__ == '__main__':
     globs = params.init();
     # Get the global params as a dictionary.
 
+    if "--stdout" in sys.argv:
+        sys.stdout = sys.stderr;
+        if hasattr(signal, "SIGPIPE"):
+            signal.signal(signal.SIGPIPE, signal.SIG_DFL);
+    # With --stdout, an output file is written to stdout, so all logging and progress messages are written to stderr instead.
+    # This is checked before anything is printed. Like other command line tools, exit quietly if the program reading
+    # the output closes the pipe early (e.g. head)
+
     print("\n" + " ".join(sys.argv) + "\n");
 
     if any(v in sys.argv for v in ["--version", "-version", "--v"]):
@@ -56,42 +66,86 @@ if __name__ == '__main__':
     # Initialize the step headers
 
     if globs['gxf-file']:
-        globs = gxf.read(globs);
-        # Read the features from the annotation file
-
-        globs = SEQ.readGenome(globs);
-        # Read the full sequence from the input genome
-
-        SEQ.checkHeaders(globs);
-        # Check to make sure the annotation and FASTA headers match
-
-        globs = SEQ.extractCDS(globs);
-        # Extract the coding sequences based on the annotation and the genome sequences
+        for gxf_num, gxf_entry in enumerate(globs['gxf-files']):
+            if len(globs['gxf-files']) > 1:
+                globs = OP.setAnnotation(globs, gxf_entry);
+            # With several annotation files, each is run in turn with its own output subdirectory
+
+            globs = gxf.read(globs);
+            # Read the features from the annotation file
+
+            if globs['regions'] or globs['transcript-ids'] or globs['longest-only']:
+                globs = gxf.filterTranscripts(globs);
+            # Remove the transcripts that aren't needed with -r, -t, or --longest-only
+
+            if gxf_num == 0:
+                globs = SEQ.detectGenomeCompression(globs);
+                genome_headers = SEQ.checkHeaders(globs);
+                # Check to make sure the annotation, FASTA, and VCF headers match before reading any sequence
+
+                globs = SEQ.readGenome(globs);
+                # Index the input genome, or read the full sequence if it can't be indexed
+            else:
+                SEQ.checkRegions(globs, genome_headers);
+            # The genome is only read and the VCF contigs are only checked for the first annotation file. The regions
+            # in the others are checked against the genome headers found then
+
+            if globs['write-cds'] or globs['write-cds-aa'] or globs['write-longest'] or globs['write-longest-aa']:
+                globs = SEQ.exportCDS(globs);
+                continue;
+            # If -c, -ca, -l, or -la is specified, write the coding sequences as they are extracted and move on to the
+            # next annotation file (or end the program below)
+
+            if not globs['stream']:
+                globs = SEQ.extractCDS(globs);
+            # Extract the coding sequences based on the annotation and the genome sequences
+
+            if globs['vcf-file'] and not globs['vcf']:
+                step = "Reading VCF file";
+                step_start_time = CORE.report_step(globs, step, False, "In progress...");
+                globs = vcf.read(globs);
+                step_start_time = CORE.report_step(globs, step, step_start_time, "Success");
+            # Read the VCF file as a pysam VariantFile object, once for all annotation files
+
+            if globs['stream']:
+                globs = degen.processCodons(globs, SEQ.streamCDS(globs));
+            # With --stream, extract and process the CDS one genome region at a time
+
+            if gxf_num == len(globs['gxf-files']) - 1:
+                step = "Removing genome sequence from memory";
+                step_start_time = CORE.report_step(globs, step, False, "In progress...");
+                globs = GENOME.closeGenome(globs);
+                step_start_time = CORE.report_step(globs, step, step_start_time, "Success");
+            # Free up the memory from the whole genome sequence (or close the indexed genome) after the last annotation file
+            # since we don't need it anymore
+
+            if not globs['stream']:
+                globs = degen.processCodons(globs);
+            # Process the extracted CDS
 
-        if globs['write-cds'] or globs['write-longest']:
-            CORE.endProg(globs);
-        # If -c is specified, end the program here
+    else:
+        if globs['cds-coords']:
+            globs = SEQ.readCDSCoords(globs);
+        # Read the genome coordinates of the coding sequences written with -c or -l
 
         if globs['vcf-file']:
             step = "Reading VCF file";
             step_start_time = CORE.report_step(globs, step, False, "In progress...");
             globs = vcf.read(globs);
             step_start_time = CORE.report_step(globs, step, step_start_time, "Success");
-        # Read the VCF file as a pysam VariantFile object
-
-        step = "Removing genome sequence from memory";
-        step_start_time = CORE.report_step(globs, step, False, "In progress...");
-        del(globs['genome-seqs']);
-        step_start_time = CORE.report_step(globs, step, step_start_time, "Success");
-        # Free up the memory from the whole genome sequence since we don't need it anymore
+        # Read the VCF file as a pysam VariantFile object, which needs --cds-coords with -s
 
-    else:
-        globs = SEQ.readCDS(globs);
-        # Read the individual coding sequences from input
+        if globs['stream']:
+            globs = degen.processCodons(globs, SEQ.streamCDSFiles(globs));
+            # With --stream, read and process the individual coding sequences one at a time
+        else:
+            globs = SEQ.readCDS(globs);
+            # Read the individual coding sequences from input
 
     #step = "Caclulating degeneracy per transcript";
     #step_start_time = CORE.report_step(globs, step, False, "In progress...");
-    globs = degen.processCodons(globs)
+    if not globs['stream'] and not globs['gxf-file']:
+        globs = degen.processCodons(globs)
     #step_start_time = CORE.report_step(globs, step, step_start_time, "Success");
 
     # if ("ns" in globs['codon-methods']):
@@ -0,0 +1,156 @@
+#############################################################################
+# Functions for random access to BGZF (bgzip) compressed files for degenotate
+# BGZF files are a series of gzip blocks of at most 64kb each, so any position
+# in the uncompressed file can be reached by decompressing only the block it is in.
+# Spec: https://samtools.github.io/hts-specs/SAMv1.pdf (section 4.1)
+#############################################################################
+
+import sys
+import os
+import struct
+import zlib
+from bisect import bisect_right
+
+#############################################################################
+
+def readBlockHeader(header):
+# Parses the 18 byte header of a BGZF block and returns the total size of the block
+# in bytes, or False if the header isn't a BGZF header
+
+    if len(header) < 18 or header[:4] != b"\x1f\x8b\x08\x04" or header[12:14] != b"BC":
+        return False;
+    # Check the gzip magic, the FEXTRA flag, and the BC subfield that marks BGZF blocks
+
+    return struct.unpack("<H", header[16:18])[0] + 1;
+    # The BSIZE field is the total block size minus 1
+
+#############################################################################
+
+def readGzi(gzi_file):
+# Reads a bgzip .gzi index into a list of (compressed offset, uncompressed offset) pairs
+# for the start of every block. The first block (0,0) isn't stored in the file, so it is added here.
+
+    with open(gzi_file, "rb") as gzi_stream:
+        num_entries = struct.unpack("<Q", gzi_stream.read(8))[0];
+        offsets = struct.unpack("<" + "Q" * (num_entries * 2), gzi_stream.read(16 * num_entries));
+
+    return [(0, 0)] + [ (offsets[i], offsets[i+1]) for i in range(0, len(offsets), 2) ];
+
+#############################################################################
+
+def buildGzi(filename, gzi_file=False):
+# Scans the block headers of a BGZF file to build the block offsets that would be in a .gzi index. Only the
+# 18 byte header and 4 byte uncompressed size at the end of each block are read, so nothing is decompressed.
+# If gzi_file is given, tries to write the index to that file.
+
+    blocks = [];
+    coffset, uoffset = 0, 0;
+
+    with open(filename, "rb") as bgzf_stream:
+        while True:
+            bgzf_stream.seek(coffset);
+            block_size = readBlockHeader(bgzf_stream.read(18));
+            if not block_size:
+                break;
+            # Stop at the end of the file (or at anything that isn't a BGZF block)
+
+            bgzf_stream.seek(coffset + block_size - 4);
+            block_usize = struct.unpack("<I", bgzf_stream.read(4))[0];
+            # The ISIZE field at the end of the block is the size of the uncompressed data
+
+            if block_usize > 0:
+                blocks.append((coffset, uoffset));
+            # Skip empty blocks, like the EOF marker block
+
+            coffset += block_size;
+            uoffset += block_usize;
+
+    if gzi_file:
+        try:
+            with open(gzi_file, "wb") as gzi_stream:
+                gzi_stream.write(struct.pack("<Q", len(blocks) - 1));
+                for block in blocks[1:]:
+                    gzi_stream.write(struct.pack("<QQ", block[0], block[1]));
+        except OSError:
+            pass;
+    # Try to save the index so it can be re-used on later runs
+
+    return blocks;
+
+#############################################################################
+
+def getBlocks(filename):
+# Gets the block offsets for a BGZF file, from its .gzi index if present or by scanning the block headers
+# and writing a .gzi index if not
+
+    gzi_file = filename + ".gzi";
+    if os.path.isfile(gzi_file) and os.path.getmtime(gzi_file) >= os.path.getmtime(filename):
+        return readGzi(gzi_file);
+    else:
+        return buildGzi(filename, gzi_file);
+
+#############################################################################
+
+class BGZFReader:
+# A read-only, file-like object for a BGZF file that supports seek() and read() using positions in
+# the uncompressed data. Only the blocks spanning the requested bytes are decompressed, and the most
+# recently decompressed blocks are kept so nearby reads don't decompress the same block again.
+
+    def __init__(self, filename, blocks=False, cache_size=8):
+        self.stream = open(filename, "rb");
+        if not blocks:
+            blocks = getBlocks(filename);
+        self.coffsets = [ block[0] for block in blocks ];
+        self.uoffsets = [ block[1] for block in blocks ];
+        self.pos = 0;
+        self.cache = {};
+        self.cache_size = cache_size;
+
+    def readBlock(self, block_index):
+    # Decompresses a single block, or gets it from the cache
+        if block_index in self.cache:
+            return self.cache[block_index];
+
+        self.stream.seek(self.coffsets[block_index]);
+        header = self.stream.read(18);
+        block_size = readBlockHeader(header);
+        data = zlib.decompress(self.stream.read(block_size - 18)[:-8], -15);
+        # The compressed data is raw deflate between the header and the 8 byte CRC32/ISIZE footer
+
+        if len(self.cache) >= self.cache_size:
+            del self.cache[next(iter(self.cache))];
+        self.cache[block_index] = data;
+        # Add the block to the cache, removing the oldest block if it is full
+
+        return data;
+
+    def seek(self, pos):
+        self.pos = pos;
+
+    def tell(self):
+        return self.pos;
+
+    def read(self, size):
+        chunks = [];
+        block_index = bisect_right(self.uoffsets, self.pos) - 1;
+        # Find the block that contains the current position
+
+        while size > 0 and 0 <= block_index < len(self.uoffsets):
+            data = self.readBlock(block_index);
+            start = self.pos - self.uoffsets[block_index];
+            chunk = data[start:start+size];
+            if not chunk:
+                break;
+            chunks.append(chunk);
+            size -= len(chunk);
+            self.pos += len(chunk);
+            block_index += 1;
+        # Read from consecutive blocks until the requested number of bytes has been read
+
+        return b"".join(chunks);
+
+    def close(self):
+        self.stream.close();
+        self.cache = {};
+
+#############################################################################
@@ -0,0 +1,104 @@
+#############################################################################
+# Coordinate conversion between positions in a CDS and positions in the genome, using a table of the coding
+# exons of each transcript instead of a lookup entry for every coding base
+#############################################################################
+
+from array import array
+from bisect import bisect_right
+
+#############################################################################
+
+class CoordMap:
+# The coding exons (blocks) of one transcript in CDS order: the offset of each block in the CDS, its genome start
+# (1-based), and its length. Blocks are also kept in genome order to convert genome positions with a binary search
+
+    __slots__ = ("strand", "cds_starts", "genome_starts", "lens", "sorted_genome_starts", "sorted_blocks");
+
+    def __init__(self, strand):
+        self.strand = strand;
+        self.cds_starts = array("q");
+        self.genome_starts = array("q");
+        self.lens = array("q");
+        self.sorted_genome_starts = None;
+        self.sorted_blocks = None;
+
+    def addBlock(self, cds_start, genome_start, block_len):
+    # Adds the next coding exon in CDS order
+
+        self.cds_starts.append(cds_start);
+        self.genome_starts.append(genome_start);
+        self.lens.append(block_len);
+
+    def finish(self):
+    # Sorts the blocks by genome position once all of them have been added
+
+        self.sorted_blocks = array("q", sorted(range(len(self.genome_starts)), key=self.genome_starts.__getitem__));
+        self.sorted_genome_starts = array("q", [ self.genome_starts[block] for block in self.sorted_blocks ]);
+
+    def toGenome(self, cds_coord):
+    # Converts a 0-based CDS coordinate to a 1-based genome coordinate
+
+        block = bisect_right(self.cds_starts, cds_coord) - 1;
+        offset = cds_coord - self.cds_starts[block];
+
+        if self.strand == "-":
+            return self.genome_starts[block] + self.lens[block] - 1 - offset;
+        return self.genome_starts[block] + offset;
+        # On the - strand, the CDS runs from the end of each block to its start
+
+    def toCDS(self, genome_coord):
+    # Converts a 1-based genome coordinate to a 0-based CDS coordinate, or None if the position isn't coding
+
+        i = bisect_right(self.sorted_genome_starts, genome_coord) - 1;
+        if i < 0:
+            return None;
+        block = self.sorted_blocks[i];
+        # The block with the closest start at or before the position
+
+        offset = genome_coord - self.genome_starts[block];
+        if offset >= self.lens[block]:
+            return None;
+        # Positions between blocks (introns) aren't in the CDS
+
+        if self.strand == "-":
+            return self.cds_starts[block] + self.lens[block] - 1 - offset;
+        return self.cds_starts[block] + offset;
+
+    def cdsLen(self):
+    # The total length of the blocks
+        return sum(self.lens);
+
+    def blocks(self, lead=0, trail=0):
+    # The 1-based start and end of each block in the genome in CDS order, leaving out the given number of bases at the
+    # start and end of the CDS (e.g. to match a CDS that has been trimmed to its frame)
+
+        first, last = lead, self.cdsLen() - trail;
+        trimmed_blocks = [];
+        for cds_start, block_len in zip(self.cds_starts, self.lens):
+            block_first, block_last = max(first, cds_start), min(last, cds_start + block_len);
+            if block_first >= block_last:
+                continue;
+            # Skip blocks that are entirely trimmed
+
+            genome_first, genome_last = self.toGenome(block_first), self.toGenome(block_last - 1);
+            trimmed_blocks.append((min(genome_first, genome_last), max(genome_first, genome_last)));
+        # Convert the first and last CDS position left in each block to the genome
+
+        return trimmed_blocks;
+
+#############################################################################
+
+def fromBlocks(strand, blocks):
+# Builds the coordinate table of a transcript from the 1-based start and end of each of its blocks in CDS order,
+# as returned by CoordMap.blocks()
+
+    coord_map = CoordMap(strand);
+    cds_coord = 0;
+    for genome_start, genome_end in blocks:
+        coord_map.addBlock(cds_coord, genome_start, genome_end - genome_start + 1);
+        cds_coord += genome_end - genome_start + 1;
+    coord_map.finish();
+
+    return coord_map;
+
+#############################################################################
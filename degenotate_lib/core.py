@@ -37,9 +37,9 @@ def errorOut(errnum, errmsg, globs):
 
 def fileCheck(globs):
 # Checks file options.
-    files = ['gxf-file', 'fa-file', 'in-seq', 'vcf-file'];
+    files = ['gxf-file', 'fa-file', 'in-seq', 'cds-coords', 'vcf-file'];
     for f in files:
-        if globs[f]:
+        if globs[f] and globs[f] != "-":
             if not os.path.isfile(globs[f]) and not os.path.isdir(globs[f]):
                 errorOut("CORE1", "File/path not found: " + globs[f], globs);
             globs[f] = os.path.abspath(globs[f]);
@@ -55,6 +55,14 @@ def fileCheck(globs):
                 # If a vcf file is given as input, check multiple possible extensions (.tbi, .csi) for an index file
                 # Error out if no index is found
     # Check if the provided files exist and error out if not
+    # Inputs read from stdin ("-") are skipped
+
+    for gxf_entry in globs['gxf-files']:
+        if gxf_entry[0] != "-":
+            if not os.path.isfile(gxf_entry[0]):
+                errorOut("CORE1", "File/path not found: " + gxf_entry[0], globs);
+            gxf_entry[0] = os.path.abspath(gxf_entry[0]);
+    # Check all of the annotation files when more than one is given
 
     return globs;
 
@@ -112,29 +120,47 @@ def detectCompression(filename):
             b"\x1f\x8b\x08": "gz",
             # b"\x1f\x8b\x08\x08": "gz",
             b"\x42\x5a\x68": "bz2",
-            b"\x50\x4b\x03\x04": "zip"
+            b"\x50\x4b\x03\x04": "zip",
+            b"\x28\xb5\x2f\xfd": "zstd"
         }
     # An encoded set of possible "magic strings" that start different types of compressed files
     # From: https://www.garykessler.net/library/file_sigs.html
     # \x is the escape code for hex values
     # b converts strings to bytes
 
-    max_len = max(len(x) for x in magic_dict)
-    # The number of characters to read from the beginning of the file should be the length of
-    # the longest magic string
-
-    file_start = open(filename, "rb").read(max_len);
-    # Read the beginning of the file up to the length of the longest magic string
+    if filename == "-":
+        file_start = sys.stdin.buffer.peek(18)[:18];
+    else:
+        file_start = open(filename, "rb").read(18);
+    # Read the beginning of the file up to the length of the longest magic string (or the 18 bytes of a BGZF header)
+    # For stdin, peek at the beginning so it can still be read from the start afterwards
 
     for magic_string in magic_dict:
         if file_start.startswith(magic_string):
             compression_type = magic_dict[magic_string];
     # Check each magic string against the start of the file
 
+    if compression_type == "gz":
+        if file_start[3:4] == b"\x04" and file_start[12:14] == b"BC":
+            compression_type = "bgzf";
+    # BGZF (bgzip) files are also gzip files, but the first block has the FEXTRA flag set and a 'BC' extra subfield
+    # that stores the size of the block. These can be read by gzip, but also allow random access with an index.
+
     return compression_type;
 
 #############################################################################
 
+def removeCompressionExt(filename):
+# Removes a compression extension (.gz, .bz2, .zst, or .zip) from the end of a file name, if it has one
+
+    for comp_ext in [".gz", ".bz2", ".zst", ".zip"]:
+        if filename.endswith(comp_ext):
+            return filename[:-len(comp_ext)];
+
+    return filename;
+
+#############################################################################
+
 def getOutTime():
 # Function to get the date and time in a certain format.
     return datetime.datetime.now().strftime("%m-%d-%Y.%I-%M-%S");
@@ -0,0 +1,283 @@
+#############################################################################
+# Functions to read compressed input files for degenotate
+# Files are decompressed on a background thread (or by a helper program like pigz or zstd) while the
+# main thread parses the decompressed data. BGZF files can have their blocks decompressed in parallel.
+#############################################################################
+
+import sys
+import os
+import io
+import bz2
+import zlib
+import queue
+import shutil
+import zipfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import degenotate_lib.bgzf as BGZF
+
+#############################################################################
+
+class StdinReader(io.RawIOBase):
+# A read-only, file-like object that reads from stdin but leaves it open when it is closed, so the readers below
+# can close their input file the same way whether it is a file or stdin
+
+    def readable(self):
+        return True;
+
+    def readinto(self, buffer):
+        return sys.stdin.buffer.readinto(buffer);
+
+#############################################################################
+
+def openRaw(filename):
+# Opens a file as bytes, or stdin if the filename is "-"
+
+    if filename == "-":
+        return io.BufferedReader(StdinReader());
+    else:
+        return open(filename, "rb");
+
+#############################################################################
+
+def gzipChunks(filename, chunk_size):
+# Decompresses a gzip file, including files with multiple gzip members like BGZF files
+
+    with openRaw(filename) as raw_stream:
+        decompressor = zlib.decompressobj(31);
+        # 31 tells zlib to expect a gzip header
+
+        for raw_chunk in iter(lambda : raw_stream.read(chunk_size), b""):
+            while raw_chunk:
+                yield decompressor.decompress(raw_chunk);
+
+                if not decompressor.eof:
+                    break;
+                raw_chunk = decompressor.unused_data;
+                decompressor = zlib.decompressobj(31);
+            # When the end of a gzip member is reached, start a new decompressor for the next member with the rest of the chunk
+
+        yield decompressor.flush();
+
+#############################################################################
+
+def bz2Chunks(filename, chunk_size):
+# Decompresses a bzip2 file, including files with multiple bzip2 streams (e.g. from pbzip2)
+
+    with openRaw(filename) as raw_stream:
+        decompressor = bz2.BZ2Decompressor();
+        for raw_chunk in iter(lambda : raw_stream.read(chunk_size), b""):
+            while raw_chunk:
+                yield decompressor.decompress(raw_chunk);
+
+                if not decompressor.eof:
+                    break;
+                raw_chunk = decompressor.unused_data;
+                decompressor = bz2.BZ2Decompressor();
+            # When the end of a stream is reached, start a new decompressor for the next stream with the rest of the chunk
+
+#############################################################################
+
+def zipChunks(filename, chunk_size):
+# Decompresses the first file in a zip archive. Zip archives can't be read from stdin, since the list of files
+# is at the end of the archive
+
+    with zipfile.ZipFile(filename) as zip_file:
+        with zip_file.open(zip_file.namelist()[0]) as zip_stream:
+            for chunk in iter(lambda : zip_stream.read(chunk_size), b""):
+                yield chunk;
+
+#############################################################################
+
+def decompressBlock(block):
+# Decompresses a single BGZF block. The compressed data is raw deflate between the 18 byte header and the 8 byte footer
+    return zlib.decompress(block[18:-8], -15);
+
+#############################################################################
+
+def bgzfChunks(filename, chunk_size, threads):
+# Decompresses a BGZF file by splitting it into its blocks and decompressing the blocks of each chunk of the
+# file in parallel. zlib releases the GIL, so the blocks are decompressed at the same time on the threads.
+# Splitting the blocks first also avoids copying the rest of the chunk at the end of every block, as zlib does for
+# files with many gzip members.
+
+    with openRaw(filename) as raw_stream, ThreadPoolExecutor(max_workers=threads) as executor:
+        if threads > 1:
+            block_map = executor.map;
+        else:
+            block_map = map;
+        # With one thread, decompress the blocks on the background thread itself
+
+        data = b"";
+        for raw_chunk in iter(lambda : raw_stream.read(chunk_size), b""):
+            data += raw_chunk;
+
+            blocks = [];
+            pos = 0;
+            while True:
+                block_size = BGZF.readBlockHeader(data[pos:pos+18]);
+                if not block_size or pos + block_size > len(data):
+                    break;
+                blocks.append(data[pos:pos+block_size]);
+                pos += block_size;
+            # Split the chunk into whole blocks
+
+            if not blocks and len(data) >= 18 and not BGZF.readBlockHeader(data[:18]):
+                raise zlib.error("Invalid BGZF block in " + filename);
+            # Anything that isn't a BGZF block can't be decompressed this way
+
+            data = data[pos:];
+            # Keep any partial block at the end of the chunk for the next chunk
+
+            yield b"".join(block_map(decompressBlock, blocks));
+        ## End chunk loop
+
+        if data:
+            raise zlib.error("Truncated BGZF block at the end of " + filename);
+
+#############################################################################
+
+def processChunks(cmd, chunk_size):
+# Reads the output of a helper program that decompresses the file (e.g. pigz or zstd) in its own process
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE);
+    try:
+        for chunk in iter(lambda : proc.stdout.read(chunk_size), b""):
+            yield chunk;
+
+        if proc.wait() != 0:
+            raise OSError("Decompression failed: " + " ".join(cmd) + "\n" + proc.stderr.read().decode());
+    finally:
+        if proc.poll() is None:
+            proc.kill();
+            proc.wait();
+        proc.stdout.close();
+        proc.stderr.close();
+    # Make sure the helper program is stopped if the file is closed before it is fully read
+
+#############################################################################
+
+def zstdChunks(filename, chunk_size):
+# Decompresses a zstd file with the zstandard module
+
+    import zstandard;
+    with openRaw(filename) as raw_stream:
+        with zstandard.ZstdDecompressor().stream_reader(raw_stream, read_across_frames=True) as zstd_stream:
+            for chunk in iter(lambda : zstd_stream.read(chunk_size), b""):
+                yield chunk;
+
+#############################################################################
+
+class ThreadedReader(io.RawIOBase):
+# A read-only, file-like object that runs a generator of decompressed chunks on a background thread, so the file is
+# decompressed while the main thread is parsing the previous chunks. At most max_chunks chunks are held in memory.
+
+    def __init__(self, chunk_iter, max_chunks=4):
+        self.chunks = queue.Queue(maxsize=max_chunks);
+        self.stopped = threading.Event();
+        self.chunk = b"";
+        self.pos = 0;
+        self.done = False;
+
+        self.thread = threading.Thread(target=self.decompress, args=(chunk_iter,), daemon=True);
+        self.thread.start();
+
+    def decompress(self, chunk_iter):
+    # Runs on the background thread. Errors are passed to the main thread to be raised there.
+        try:
+            for chunk in chunk_iter:
+                if self.stopped.is_set():
+                    break;
+                if chunk:
+                    self.chunks.put(chunk);
+            self.chunks.put(None);
+        except Exception as error:
+            self.chunks.put(error);
+        finally:
+            chunk_iter.close();
+
+    def readable(self):
+        return True;
+
+    def readinto(self, buffer):
+        while self.pos >= len(self.chunk):
+            if self.done:
+                return 0;
+            chunk = self.chunks.get();
+            if chunk is None:
+                self.done = True;
+                return 0;
+            if isinstance(chunk, Exception):
+                self.done = True;
+                raise chunk;
+            self.chunk, self.pos = chunk, 0;
+        # Get the next chunk from the background thread when the current one has been read
+
+        size = min(len(buffer), len(self.chunk) - self.pos);
+        buffer[:size] = self.chunk[self.pos:self.pos+size];
+        self.pos += size;
+
+        return size;
+
+    def close(self):
+        if not self.closed:
+            self.stopped.set();
+            while self.thread.is_alive():
+                try:
+                    self.chunks.get(timeout=0.1);
+                except queue.Empty:
+                    pass;
+            # Empty the queue so the background thread isn't stuck waiting to add a chunk, and let it stop
+        super().close();
+
+#############################################################################
+
+def openFile(filename, compression, threads=1, text=False, chunk_size=2**22):
+# Opens an input file for reading, decompressing it on a background thread if it is compressed
+# compression is the type detected by CORE.detectCompression() and threads is the number of threads that can be used
+# to decompress BGZF files (-p). Returns a binary file-like object, or a text one if text is True
+# A filename of "-" reads from stdin
+
+    if compression == "none":
+        file_stream = openRaw(filename);
+
+    else:
+        if compression == "bgzf":
+            chunk_iter = bgzfChunks(filename, chunk_size, threads);
+        # Decompress the blocks of BGZF files in parallel
+
+        elif compression == "gz":
+            if threads > 1 and shutil.which("pigz") and filename != "-":
+                chunk_iter = processChunks(["pigz", "-dc", filename], chunk_size);
+            else:
+                chunk_iter = gzipChunks(filename, chunk_size);
+        # Use pigz to decompress gzip files if it is installed and more than one thread can be used
+
+        elif compression == "bz2":
+            chunk_iter = bz2Chunks(filename, chunk_size);
+
+        elif compression == "zstd":
+            try:
+                import zstandard;
+                chunk_iter = zstdChunks(filename, chunk_size);
+            except ImportError:
+                if not shutil.which("zstd") or filename == "-":
+                    raise OSError("Reading zstd compressed files requires either the zstandard Python module or the zstd program: " + filename);
+                chunk_iter = processChunks(["zstd", "-dcq", filename], chunk_size);
+        # zstd files are read with the zstandard module if it is installed, or the zstd program if it isn't
+
+        elif compression == "zip":
+            if filename == "-":
+                raise OSError("Zip archives can't be read from stdin. Unzip the file first or use another compression.");
+            chunk_iter = zipChunks(filename, chunk_size);
+
+        file_stream = io.BufferedReader(ThreadedReader(chunk_iter), buffer_size=chunk_size);
+    # Decompress the file on a background thread
+
+    if text:
+        return io.TextIOWrapper(file_stream);
+    else:
+        return file_stream;
+
+#############################################################################
@@ -9,6 +9,7 @@ import re
 import itertools
 import degenotate_lib.vcf as VCF
 import degenotate_lib.output as OUT
+import degenotate_lib.manifest as MANIFEST
 import degenotate_lib.core as CORE
 
 #############################################################################
@@ -90,6 +91,31 @@ def getFrame(seq):
 
 #############################################################################
 
+def haplotypeCodons(codons, changes, summary, DEGEN_DICT):
+# Applies the bases that differ in a haplotype to the codons of a transcript. Returns the changed codons by index and
+# the site counts of the haplotype, which are the counts of the reference with the changed codons swapped out
+
+    hap_codons = {};
+    for cds_pos, base in changes.items():
+        codon_index, codon_pos = divmod(cds_pos, 3);
+        codon = hap_codons.get(codon_index, codons[codon_index]);
+        hap_codons[codon_index] = codon[:codon_pos] + base + codon[codon_pos+1:];
+    # Build the haplotype codon for each codon with a change
+
+    hap_summary = dict(summary);
+    nt = {'A', 'T', 'G', 'C'};
+    for codon_index, hap_codon in hap_codons.items():
+        for codon, count in ((codons[codon_index], -1), (hap_codon, 1)):
+            if len(set(codon) - nt) == 0:
+                for fold in DEGEN_DICT[codon]:
+                    hap_summary[int(fold)] += count;
+    # Remove the counts of the reference codon and add those of the haplotype codon. Codons with bases other
+    # than A, T, C, or G aren't counted, as in the reference
+
+    return hap_codons, hap_summary;
+
+#############################################################################
+
 def frameError(seq,frame):
 # Check that the sequence is the correct multiple of three for the starting frame
 
@@ -191,31 +217,49 @@ def compute_imputed_MKT(p, p0, d, d0, p_high, p0_high, p_low, p0_low):
 
 #############################################################################
 
-def processCodons(globs):
+def processCodons(globs, batches=False):
 # take CDS sequence and split into list of codons, computing degeneracy, ns, or both
+# batches can be given as an iterable of lists of transcripts whose CDS are in globs['cds-seqs'] when
+# each list is reached (e.g. SEQ.streamCDS() or SEQ.streamCDSFiles() for --stream). Otherwise, all CDS in globs['cds-seqs']
+# are processed.
 
     DEGEN_DICT, CODON_DICT, CODON_GRAPH, globs = readDegen(globs)
     #MKTable = namedtuple("MKTable", "pn ps dn ds")
 
     ####################
 
-    num_transcripts = len(globs['cds-seqs']);
+    if batches and globs['gxf-file']:
+        num_transcripts = " / " + str(len(globs['annotation']));
+    elif batches:
+        num_transcripts = "";
+    else:
+        num_transcripts = " / " + str(len(globs['cds-seqs']));
+        batches = [ list(globs['cds-seqs']) ];
+    # Without batches, all transcripts are processed as one batch
+    # When streaming CDS files (-s with --stream) the total number of transcripts isn't known
 
     step = "Caclulating degeneracy per transcript";
-    step_start_time = CORE.report_step(globs, step, False, "Processed 0 / " + str(num_transcripts) + " transcripts...", full_update=True);
+    step_start_time = CORE.report_step(globs, step, False, "Processed 0" + num_transcripts + " transcripts...", full_update=True);
     # Status update
 
     ####################
 
-    with open(globs['outbed'], "w") as bedfile, open(globs['out-transcript'], "w") as transcriptfile:
+    with OUT.openOutput(globs['outbed']) as bedfile, OUT.openOutput(globs['out-transcript']) as transcriptfile:
         
         OUT.initializeTranscriptSummary(transcriptfile);
         # Write the column headers to the transcript summary file
 
         if globs['outseq']:
-            seq_stream = open(globs['outseq'], "w");
+            seq_stream = OUT.openOutput(globs['outseq']);
         # Open the sequence file if necessary
 
+        if globs['haplotypes']:
+            hapseq_stream = OUT.openOutput(globs['outhapseq']);
+            hapcounts_stream = OUT.openOutput(globs['outhapcounts']);
+            OUT.initializeHaplotypeSummary(hapcounts_stream);
+            num_unphased = 0;
+        # Open the haplotype files with --haplotypes
+
         if "ns" in globs['codon-methods']:
             try:
                 from scipy.stats import fisher_exact
@@ -225,10 +269,33 @@ def processCodons(globs):
 
             mk_stream = OUT.initializeMKFile(globs, globs['outmk']);
             # Open the MK file
+
+            if not globs['imp-maf-cutoff']:
+                globs['imp-maf-cutoff'] = 0.15
+            # cutoff for imputed MKT
         # Prep for MK tables and tests if specified
 
+        out_streams = { 'bed' : bedfile };
+        if "ns" in globs['codon-methods']:
+            out_streams['mk'] = mk_stream;
+        if globs['outseq']:
+            out_streams['seq'] = seq_stream;
+        # The output files with rows for each transcript
+
+        write_manifest = not globs['stdout-output'];
+        manifest_rows = [];
+        # The run manifest records each transcript and where its output is, so a later run can reuse it with --prev-run.
+        # It isn't written if one of the outputs is going to stdout
+
+        if globs['prev-run']:
+            prev_transcripts, prev_streams = MANIFEST.readPrevRun(globs);
+        else:
+            prev_transcripts, prev_streams = {}, {};
+        num_reused = 0;
+        # Read the manifest of the previous run with --prev-run
+
         counter = 0;
-        for transcript in globs['cds-seqs']:
+        for transcript in itertools.chain.from_iterable(batches):
 
             transcript_output = { 'bed' : [], 
                                   'mk' : { 'pn' : 0, 'ps' : 0, 'dn' : 0, 'ds' : 0,                   # polymorphism counts
@@ -244,15 +311,21 @@ def processCodons(globs):
                 transcript_output['header'] = ">" + transcript + " " + ",".join([ str(f) for f in globs['extract-fold'] ]) + "-fold degenerate sites";
             # When outputting sequences by different folds, construct the header here
 
-            if globs['gxf-file']:
-                transcript_region = globs['annotation'][transcript]['header'];
+            if globs['cds-coords'] and (transcript not in globs['coords'] or globs['coords'][transcript].cdsLen() != len(globs['cds-seqs'][transcript])):
+                CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + transcript + " is missing from the CDS coordinates file (--cds-coords) or its length doesn't match....skipping");
+                globs['warnings'] += 1;
+                continue;
+            # With --cds-coords, every CDS needs coordinates that cover the whole sequence
+
+            if globs['gxf-file'] or globs['cds-coords']:
+                transcript_region = globs['annotation'][transcript].header;
             else:
                 transcript_region = transcript;
-            # Get the genome region if the input was a gxf file+genome
+            # Get the genome region if the input was a gxf file+genome or CDS with --cds-coords
 
             if globs['gxf-file']:
-                frame = globs['annotation'][transcript]['start-frame']
-                strand = globs['annotation'][transcript]['strand']
+                frame = globs['annotation'][transcript].start_frame
+                strand = globs['annotation'][transcript].strand
 
                 if frame is None:
                     CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + transcript + " has an unknown frame....skipping");
@@ -261,13 +334,33 @@ def processCodons(globs):
             # Get the frame when input is a gxf+genome
             else:
                 frame = getFrame(globs['cds-seqs'][transcript]);
-                strand = "+"
+                strand = globs['annotation'][transcript].strand if globs['cds-coords'] else "+";
                 if frame != 0:
                     CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + transcript + " is partial with unknown frame....skipping");
                     globs['warnings'] += 1;                    
                     continue;
             # Get the frame when input is a dir/file of individual CDS seqs
             # In this case we just check to make sure the sequence is a multiple of 3
+            # The strand is only known with --cds-coords
+
+            if write_manifest or prev_transcripts:
+                signature = MANIFEST.transcriptSignature(globs, transcript);
+                starts = MANIFEST.outputStarts(out_streams);
+            # The signature of the transcript and the positions in the output files where its output starts
+
+            if transcript in prev_transcripts and prev_transcripts[transcript]['signature'] == signature:
+                transcript_output['summary'] = MANIFEST.reuseOutput(prev_transcripts[transcript], prev_streams, out_streams);
+                OUT.writeTranscriptSummary(globs, transcript, transcript_output['summary'], transcriptfile);
+
+                if write_manifest:
+                    manifest_rows.append(MANIFEST.manifestRow(transcript, signature, transcript_output['summary'], starts, out_streams));
+
+                num_reused += 1;
+                counter += 1;
+                if counter % 100 == 0:
+                    cur_step_time = CORE.report_step(globs, step, step_start_time, "Processed " + str(counter) + num_transcripts + " transcripts...", full_update=True);
+                continue;
+            # If the transcript is unchanged from the previous run, copy its output instead of processing it again
 
             extra_leading_nt = frame
             # Look up the number of leading bases given the current frame
@@ -361,12 +454,16 @@ def processCodons(globs):
             # End degen method block
             ####################
 
+            if "ns" in globs['codon-methods']:
+                cds_records = list(VCF.cdsRecords(globs, transcript, transcript_region, extra_leading_nt, extra_trailing_nt));
+            # Read the VCF records in the CDS once for both the MK tests and the haplotypes
+
             if "ns" in globs['codon-methods']:
 
                 #define coordinate shift based on frame
                 #transcript_position = extra_leading_nt;
 
-                mk_codons, globs = VCF.getVariants(globs, transcript, transcript_region, codons, extra_leading_nt, extra_trailing_nt)
+                mk_codons, globs = VCF.getVariants(globs, transcript, codons, extra_leading_nt, cds_records)
                 # Call get variants for this transcript: returns a dictionary with the key being the index of each codon in codons with values as follows:
                 # 'poly' :       A list of codons that incorporate all SNPs in the ingroup samples, one codon
                 #                per alternate allele per site. As is, this list will never have the reference codon in it,
@@ -478,14 +575,23 @@ def processCodons(globs):
             if globs['outseq']:
                 OUT.writeSeq(transcript_output['header'], transcript_output['seq'], seq_stream);
 
+            if globs['haplotypes']:
+                hap_changes, unphased = VCF.getHaplotypes(globs, transcript, cds_records, extra_leading_nt, len(fasta));
+                num_unphased += unphased;
+
+                for sample, hap_num in hap_changes:
+                    hap_codons, hap_summary = haplotypeCodons(codons, hap_changes[(sample, hap_num)], transcript_output['summary'], DEGEN_DICT);
+                    hap_seq = "".join([ hap_codons.get(codon_index, codon) for codon_index, codon in enumerate(codons) ]) if hap_codons else fasta;
+                    OUT.writeSeq(">" + transcript + "|" + sample + "|" + str(hap_num), hap_seq, hapseq_stream);
+                    OUT.writeHaplotypeSummary(transcript, sample, hap_num, len(hap_changes[(sample, hap_num)]), hap_summary, hapcounts_stream);
+            # With --haplotypes, write the in-frame CDS and site counts of each haplotype of each sample
+
             if "ns" in globs['codon-methods']:
 
                 if not globs['ingroup-maf-cutoff']:
                     globs['ingroup-maf-cutoff'] = 1 / globs['num-ingroup-chr']
                 ext_cutoff = globs['ingroup-maf-cutoff']
                 # singletons
-                if not globs['imp-maf-cutoff']:
-                    globs['imp-maf-cutoff'] = 0.15
                 imp_cutoff = globs['imp-maf-cutoff']
                 # cutoff for imputed MKT
 
@@ -538,9 +644,13 @@ def processCodons(globs):
                 OUT.writeMK(globs, transcript, transcript_output['mk'], mk_stream);
             # Write the MK table for this transcript
 
+            if write_manifest:
+                manifest_rows.append(MANIFEST.manifestRow(transcript, signature, transcript_output['summary'], starts, out_streams));
+            # Record where the output for this transcript is in the run manifest
+
             counter += 1;
             if counter % 100 == 0:
-                cur_step_time = CORE.report_step(globs, step, step_start_time, "Processed " + str(counter) + " / " + str(num_transcripts) + " transcripts...", full_update=True);
+                cur_step_time = CORE.report_step(globs, step, step_start_time, "Processed " + str(counter) + num_transcripts + " transcripts...", full_update=True);
             # A counter and a status update every 100 loci
 
         # End transcript loop
@@ -557,7 +667,26 @@ def processCodons(globs):
         mk_stream.close();
     # Close the MK file if necessary
 
-    step_start_time = CORE.report_step(globs, step, step_start_time, "Success", full_update=True);
+    if globs['haplotypes']:
+        hapseq_stream.close();
+        hapcounts_stream.close();
+        if num_unphased:
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: " + str(num_unphased) + " heterozygous genotypes in the CDS weren't phased and were left as the reference in the haplotypes.");
+            globs['warnings'] += 1;
+    # Close the haplotype files and warn about unphased genotypes
+
+    for prev_stream in prev_streams.values():
+        prev_stream.close();
+    # Close the output files from the previous run
+
+    if write_manifest:
+        MANIFEST.writeManifest(globs, manifest_rows, { out : globs[{ 'bed' : 'outbed', 'mk' : 'outmk', 'seq' : 'outseq' }[out]] for out in out_streams });
+    # Write the run manifest once the output files are closed
+
+    if globs['prev-run']:
+        step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(num_reused) + " reused from previous run", full_update=True);
+    else:
+        step_start_time = CORE.report_step(globs, step, step_start_time, "Success", full_update=True);
     # Status update
 
     return globs
@@ -0,0 +1,348 @@
+#############################################################################
+# Functions for indexed access to uncompressed and BGZF compressed genome FASTA files, and to the
+# packed genome cache, for degenotate
+#############################################################################
+
+import sys
+import os
+import mmap
+import degenotate_lib.core as CORE
+import degenotate_lib.bgzf as BGZF
+import degenotate_lib.twobit as TWOBIT
+import degenotate_lib.decompress as DECOMP
+
+#############################################################################
+
+def buildIndex(fa_stream, fai_file):
+# Scans an uncompressed FASTA file (or the decompressed stream of a BGZF FASTA file) and builds a samtools
+# style .fai index for it
+# Each entry is: <name> <length> <offset of first base> <bases per line> <bytes per line>
+# Returns the entries as a list, or False if the line lengths within a sequence are inconsistent
+# (in which case the file cannot be indexed)
+
+    entries = [];
+    cur = False;
+    # The list of index entries and the entry for the current sequence
+
+    offset = 0;
+    # The byte offset of the start of the current line
+
+    with fa_stream:
+        for line in fa_stream:
+            line_len = len(line);
+
+            if line[:1] == b">":
+                if cur:
+                    entries.append(cur);
+                name = line[1:].split();
+                cur = { 'name' : name[0].decode() if name else "", 'len' : 0, 'offset' : offset + line_len,
+                        'linebases' : 0, 'linewidth' : 0, 'last' : False };
+            # A new header line starts a new entry
+
+            elif cur:
+                bases = len(line.rstrip(b"\r\n"));
+
+                if cur['last'] or bases == 0:
+                    if bases > 0:
+                        return False;
+                    cur['last'] = True;
+                # A line after a shorter line within the same sequence means the line lengths are not consistent
+                # Blank lines are only allowed at the end of a sequence
+
+                elif cur['linebases'] == 0:
+                    cur['linebases'], cur['linewidth'] = bases, line_len;
+                # The first sequence line sets the line length for this sequence
+
+                elif bases > cur['linebases']:
+                    return False;
+                # Lines longer than the first line can't be indexed
+
+                elif bases < cur['linebases'] or line_len != cur['linewidth']:
+                    cur['last'] = True;
+                # A line shorter than the first line (or missing its line break) must be the last line of this sequence
+
+                cur['len'] += bases;
+            # Sequence lines add to the length of the current entry
+
+            offset += line_len;
+
+    if cur:
+        entries.append(cur);
+    # Add the last entry
+
+    try:
+        with open(fai_file, "w") as fai_stream:
+            for entry in entries:
+                fai_stream.write("\t".join([ entry['name'], str(entry['len']), str(entry['offset']), str(entry['linebases']), str(entry['linewidth']) ]) + "\n");
+    except OSError:
+        pass;
+    # Try to save the index next to the FASTA file so it can be re-used on later runs. If the directory isn't writable
+    # we still have the index in memory for this run
+
+    return [ [ entry['name'], entry['len'], entry['offset'], entry['linebases'], entry['linewidth'] ] for entry in entries ];
+
+#############################################################################
+
+def readIndex(fai_file):
+# Reads the entries of a samtools style .fai index
+
+    entries = [];
+    for line in open(fai_file):
+        line = line.rstrip("\n").split("\t");
+        if len(line) < 5:
+            continue;
+        entries.append([ line[0], int(line[1]), int(line[2]), int(line[3]), int(line[4]) ]);
+
+    return entries;
+
+#############################################################################
+
+def getIndex(globs):
+# Reads the .fai index of the genome FASTA file, or builds one if it doesn't exist. Returns the index entries, or
+# False if the genome cannot be indexed.
+
+    fai_file = globs['fa-file'] + ".fai";
+
+    if os.path.isfile(fai_file) and os.path.getmtime(fai_file) >= os.path.getmtime(globs['fa-file']):
+        return readIndex(fai_file);
+    elif globs['seq-compression'] == "bgzf":
+        return buildIndex(DECOMP.openFile(globs['fa-file'], "bgzf", globs['num-procs']), fai_file);
+    else:
+        return buildIndex(open(globs['fa-file'], "rb"), fai_file);
+    # Use an existing index if it is newer than the FASTA file, otherwise build one
+    # For BGZF files the offsets in the .fai index are positions in the decompressed file
+
+#############################################################################
+
+def indexGenome(globs):
+# Reads the .fai index of the genome FASTA file, or builds one if it doesn't exist, and opens the genome for
+# random access. Uncompressed and BGZF compressed genomes can be indexed. Returns False if the genome cannot be indexed.
+
+    entries = getIndex(globs);
+    if not entries:
+        return False;
+
+    for name, seq_len, offset, linebases, linewidth in entries:
+        header = name;
+        if globs['seq-delim']:
+            header = header.split(globs['seq-delim'])[0];
+        # Trim the header with the -d option, as in SEQ.readFasta()
+
+        globs['genome-index'][header] = (seq_len, offset, linebases, linewidth);
+    # Store the index as <header> : (<length>, <offset>, <bases per line>, <bytes per line>)
+
+    if globs['seq-compression'] == "bgzf":
+        globs['genome-stream'] = BGZF.BGZFReader(globs['fa-file']);
+    else:
+        globs['genome-stream'] = open(globs['fa-file'], "rb");
+    # Keep the genome file open for the rest of the run. For BGZF files, the reader uses the block offsets
+    # from the .gzi index (built if it doesn't exist) to only decompress the blocks that contain each exon
+
+    return True;
+
+#############################################################################
+
+def cacheGenome(globs, seq_iter):
+# Opens the packed genome cache for the genome FASTA file, building it first from the (name, sequence) tuples
+# in seq_iter if it doesn't exist or is older than the FASTA file. Returns False if the cache can't be written.
+
+    if not TWOBIT.checkCache(globs['fa-file']):
+        step = "Building genome cache";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+        try:
+            num_seqs = TWOBIT.buildCache(seq_iter, globs['fa-file']);
+        except OSError:
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Failed: could not write " + TWOBIT.cacheFile(globs['fa-file']));
+            return False;
+        step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(num_seqs) + " seqs cached");
+    # Build the cache once. Later runs on the same genome will use it until the FASTA file changes
+
+    globs['genome-stream'] = TWOBIT.CachedGenome(globs['fa-file']);
+    # Memory-map the cache
+
+    for name in globs['genome-stream'].seqs:
+        header = name;
+        if globs['seq-delim']:
+            header = header.split(globs['seq-delim'])[0];
+        # Trim the header with the -d option, as in SEQ.readFasta()
+
+        globs['genome-index'][header] = (globs['genome-stream'].seqs[name]['len'], name);
+    # Store the index as <header> : (<length>, <name in the cache>)
+
+    return True;
+
+#############################################################################
+
+def scanFastaHeaders(file_stream, chunk_size=2**24):
+# Gets the header lines from a FASTA file without parsing any sequence, by finding every new line that starts
+# with ">" in large chunks of the file
+
+    headers = [];
+    carry = b"\n";
+    # The end of the previous chunk, in case a header is split between chunks. This starts as a line break so
+    # a header on the first line of the file is found
+
+    with file_stream:
+        for chunk in iter(lambda : file_stream.read(chunk_size), b""):
+            if len(carry) > 1 or (carry == b"\n" and chunk[:1] == b">"):
+                data = carry + chunk;
+            else:
+                data = chunk;
+            carry = data[-1:];
+            # Only join the chunk to the end of the previous one if a header might be split between them, to avoid
+            # copying every chunk
+
+            pos = data.find(b"\n>");
+            while pos != -1:
+                line_end = data.find(b"\n", pos + 2);
+                if line_end == -1:
+                    carry = data[pos:];
+                    break;
+                # If the header continues into the next chunk, keep it for the next chunk
+
+                headers.append(data[pos+2:line_end].decode().rstrip());
+                pos = data.find(b"\n>", line_end);
+            ## End header loop
+        ## End chunk loop
+
+    if carry[:2] == b"\n>":
+        headers.append(carry[2:].decode().rstrip());
+    # A header on the last line of the file without a line break
+
+    return headers;
+
+#############################################################################
+
+def scanHeaders(globs):
+# Gets the sequence headers in the genome without reading any sequence, named the same way as when the sequences
+# are read. The names come from the genome cache or .fai index (building the index if needed) when available.
+# Otherwise (e.g. for plain gzipped genomes) the headers are found by scanning the file for header lines.
+
+    names = False;
+
+    if globs['genome-cache'] and TWOBIT.checkCache(globs['fa-file']):
+        cached_genome = TWOBIT.CachedGenome(globs['fa-file']);
+        names = list(cached_genome.seqs);
+        cached_genome.close();
+    # Get the names from the genome cache if it has already been built
+
+    elif globs['seq-compression'] in ["none", "bgzf"]:
+        entries = getIndex(globs);
+        if entries:
+            names = [ entry[0] for entry in entries ];
+    # Get the names from the .fai index. If the index doesn't exist it is built here and re-used when the genome is read
+
+    if names is False:
+        if globs['seq-compression'] == "none":
+            names = scanFastaHeaders(open(globs['fa-file'], "rb"));
+        else:
+            names = scanFastaHeaders(DECOMP.openFile(globs['fa-file'], globs['seq-compression'], globs['num-procs']));
+
+        names = [ (name.split() or [""])[0] for name in names ];
+    # Otherwise scan the file for headers. Genome sequences are always named by the first word of the header
+
+    if globs['seq-delim']:
+        names = [ name.split(globs['seq-delim'])[0] for name in names ];
+    # Trim the headers with the -d option, as in SEQ.readFasta()
+
+    return names;
+
+#############################################################################
+
+def getSeq(globs, header, start, end):
+# Returns the sequence as bytes from start to end (0-based, end exclusive, like a Python slice) in the given
+# genome region, either from the packed genome cache, by seeking to it in an indexed genome, or by slicing the genome (or region) read into memory
+
+    if header in globs['genome-seqs'] or not globs['genome-index']:
+        return globs['genome-seqs'][header][start:end];
+    # Slice the sequence if the region has been read into memory
+
+    if globs['genome-cache']:
+        return globs['genome-stream'].getSeq(globs['genome-index'][header][1], start, end);
+    # Rebuild the sequence from the packed genome cache
+
+    seq_len, offset, linebases, linewidth = globs['genome-index'][header];
+
+    end = min(end, seq_len);
+    if start >= end:
+        return b"";
+    # Python slice semantics for coordinates past the end of the sequence
+
+    start_byte = offset + (start // linebases) * linewidth + start % linebases;
+    end_byte = offset + ((end - 1) // linebases) * linewidth + (end - 1) % linebases + 1;
+    # Convert the sequence positions into byte positions in the file, accounting for line breaks
+
+    globs['genome-stream'].seek(start_byte);
+    seq = globs['genome-stream'].read(end_byte - start_byte);
+    # Read the bytes spanning the region
+
+    return seq.replace(b"\n", b"").replace(b"\r", b"");
+    # Remove the line breaks
+
+#############################################################################
+
+def shareGenome(globs):
+# Describes how worker processes can open the genome for parallel CDS extraction without being sent a copy of it.
+# Indexed genomes and the genome cache are opened from their files by each worker. A genome that was read into
+# memory is copied once into a shared memory block. Returns the description and any shared memory blocks, which
+# should be closed and unlinked once the workers are done
+
+    if globs['genome-index']:
+        return { 'fa-file' : globs['fa-file'], 'compression' : globs['seq-compression'], 'cache' : globs['genome-cache'], 'index' : globs['genome-index'] }, [];
+    # Indexed or cached genomes
+
+    from multiprocessing import shared_memory
+    shared_block = shared_memory.SharedMemory(create=True, size=max(1, sum( len(seq) for seq in globs['genome-seqs'].values() )));
+    offsets, pos = {}, 0;
+    for header, seq in globs['genome-seqs'].items():
+        shared_block.buf[pos:pos+len(seq)] = seq;
+        offsets[header] = (pos, len(seq));
+        pos += len(seq);
+    # Copy the sequences into the shared block one after another, recording where each one starts
+
+    return { 'shared' : shared_block.name, 'offsets' : offsets }, [shared_block];
+
+#############################################################################
+
+def openSharedGenome(genome_source):
+# Opens the genome in a worker process from the description made by shareGenome(). Returns a dictionary with the
+# same genome keys as globs so getSeq() can be used on it
+
+    genome = { 'genome-seqs' : {}, 'genome-index' : {}, 'genome-cache' : False, 'genome-stream' : False, 'shared-block' : False };
+
+    if 'shared' in genome_source:
+        from multiprocessing import shared_memory
+        genome['shared-block'] = shared_memory.SharedMemory(name=genome_source['shared']);
+        genome['genome-seqs'] = { header : genome['shared-block'].buf[start:start+seq_len] for header, (start, seq_len) in genome_source['offsets'].items() };
+    # For a genome in shared memory, each sequence is a view of its part of the block, so slicing it doesn't copy the sequence
+
+    else:
+        genome['genome-index'] = genome_source['index'];
+        if genome_source['cache']:
+            genome['genome-cache'] = True;
+            genome['genome-stream'] = TWOBIT.CachedGenome(genome_source['fa-file']);
+        elif genome_source['compression'] == "bgzf":
+            genome['genome-stream'] = BGZF.BGZFReader(genome_source['fa-file']);
+        else:
+            with open(genome_source['fa-file'], "rb") as fa_stream:
+                genome['genome-stream'] = mmap.mmap(fa_stream.fileno(), 0, access=mmap.ACCESS_READ);
+    # Each worker opens its own reader for a cached or BGZF genome, and memory-maps an uncompressed genome so the
+    # pages are shared between the workers
+
+    return genome;
+
+#############################################################################
+
+def closeGenome(globs):
+# Closes the indexed genome file (or genome cache) and removes any genome sequence from memory
+
+    if globs['genome-stream']:
+        globs['genome-stream'].close();
+        globs['genome-stream'] = False;
+
+    globs['genome-seqs'] = {};
+    globs['genome-index'] = {};
+
+    return globs;
+
+#############################################################################
@@ -4,11 +4,77 @@
 
 import sys
 import os
-import gzip
+import pickle
+import itertools
+import multiprocessing as mp
+from array import array
+from bisect import bisect_right
+import degenotate_lib.decompress as DECOMP
+import degenotate_lib.bgzf as BGZF
 import degenotate_lib.core as CORE
 
 #############################################################################
 
+TRANSCRIPT_TYPES = { b"transcript", b"mRNA", b"V_gene_segment", b"C_gene_segment" };
+CDS_TYPES = { b"CDS" };
+# The feature types that are read from the annotation file. Any unconfirmed_transcript features are skipped
+
+WINDOW_TYPES = { feature_type.decode() for feature_type in TRANSCRIPT_TYPES } | { "gene" };
+# With -r and a tabix indexed annotation file, BED intervals are widened to cover the features of these types that overlap them
+
+PARALLEL_MIN_SIZE = 2**24;
+# With -p, uncompressed and BGZF annotation files at least this large (in uncompressed bytes) are parsed in parallel
+
+CACHE_VERSION = 2;
+# The version of the annotation cache format. Caches from other versions are rebuilt
+
+#############################################################################
+
+class Transcript:
+# A transcript in the annotation dict. Slots are used instead of a dict for each transcript, and the coding exons are
+# stored as arrays of their starts, ends, and phases (in the order they were read) instead of a dict for each exon, to
+# keep the annotation small for large genomes. Sequence headers and gene IDs are interned so each is only stored once.
+# Phases that aren't 0, 1, or 2 (e.g. ".") are stored as -1.
+
+    __slots__ = ("header", "start", "end", "len", "strand", "gene_id", "longest", "cdslen", "start_frame", "coding_start",
+                 "exon_starts", "exon_ends", "exon_phases", "exon_strands");
+
+    def __init__(self, header, start, end, strand, gene_id):
+        self.header = sys.intern(header);
+        self.start = start;
+        self.end = end;
+        self.len = end - start;
+        self.strand = strand;
+        self.gene_id = sys.intern(gene_id);
+        self.longest = "no";
+        self.cdslen = 0;
+        self.start_frame = None;
+        self.coding_start = None;
+        # start_frame and coding_start are set when the CDS is extracted
+
+        self.exon_starts = array("q");
+        self.exon_ends = array("q");
+        self.exon_phases = array("b");
+        self.exon_strands = "";
+
+    def addExon(self, start, end, strand, phase):
+    # Adds a coding exon to the transcript
+        self.exon_starts.append(start);
+        self.exon_ends.append(end);
+        self.exon_phases.append(int(phase) if phase in ("0", "1", "2") else -1);
+        self.exon_strands += strand;
+        self.cdslen += end - start + 1;
+
+    def takeExons(self, other):
+    # Takes the coding exons from another transcript with the same ID
+        self.exon_starts, self.exon_ends, self.exon_phases, self.exon_strands = other.exon_starts, other.exon_ends, other.exon_phases, other.exon_strands;
+        self.cdslen = other.cdslen;
+
+    def numExons(self):
+        return len(self.exon_starts);
+
+#############################################################################
+
 def checkIDs(l, info, id_list, step, globs):
 # Each time we read feature info and look for IDs, this checks to make sure only one
 # ID is found. Probably unnecessary, but easy enough to check.
@@ -24,104 +90,219 @@ def checkIDs(l, info, id_list, step, globs):
 
 #############################################################################
 
-def readFeatures(globs, file_reader, line_reader, feature_list, id_format, parent_id_format, info_field_splitter):
-
-    num_features = 0;
-    for line in file_reader(globs['gxf-file']):
-            line = line_reader(line);
-            # Read and parse the current line of the GXF file
-
-            if "##FASTA" in line[0]:
-                break;
-            # Maker GFF files sometimes include the sequence of all transcripts at the end. We need to stop reading the file
-            # at that point.
-
-            if line[0][0] == "#":
-                continue;
-            # Header/comment lines should be skipped. Note that this must come after the check for "##FASTA" above, or else
-            # the file will keep being read into the sequences and error out.
+def parseLines(gxf_lines, formats, info_field_splitter):
+# Parses the transcripts and coding exons from lines of the annotation (as bytes), in the order they appear. The feature type
+# is checked before the line is decoded or its info field is parsed, so lines for other features (genes, exons, UTRs, etc.)
+# are skipped with very little work. This doesn't use globs so it can be run by worker processes with -p.
+# Yields a tuple for each feature:
+#   ("transcript", <transcript id>, <header>, <start>, <end>, <strand>, <gene id>)
+#   ("CDS", <transcript id>, <start>, <end>, <strand>, <phase>)
+#   ("error", <line>, <info fields>, <id list>, <step>) if the wrong number of IDs is found, to be reported by checkIDs()
+#   ("fasta",) if a ##FASTA line is reached
+
+    transcript_id_format, transcript_parent_format, exon_parent_format = formats;
+    # The prefixes of the ID fields to look for
+
+    for line in gxf_lines:
+        if line[:1] == b"#":
+            if line.startswith(b"##FASTA"):
+                yield ("fasta",);
+                return;
+            continue;
+        # Maker GFF files sometimes include the sequence of all transcripts at the end. We need to stop reading the file
+        # at that point. Other header/comment lines are skipped
+
+        fields = line.split(b"\t", 3);
+        if len(fields) < 4:
+            continue;
+        # Skip blank lines
+
+        feature_type = fields[2];
+        if feature_type not in TRANSCRIPT_TYPES and feature_type not in CDS_TYPES:
+            continue;
+        # Skip features other than transcripts and coding exons before doing any more parsing
+
+        line = line.decode().strip().split("\t");
+        # Decode and parse the current line of the GXF file
+
+        seq_header, start, end, strand, phase, feature_info = line[0], int(line[3]), int(line[4]), line[6], line[7], line[8].split(info_field_splitter);
+        # Unpack the pertinent information from the current line into more readable variables.
+
+        feature_info = list(filter(None, feature_info));
+        # Remove empty strings from the feature list in case the gff field has a trailing semicolon
+
+        if feature_info[-1][-1] == ";":
+            feature_info[-1] = feature_info[-1][:-1];
+        # For gtf files, the field splitter includes a space ("; "), meaning the last entry of feature_info will still contain a ; (since it ends ";\n")
+        # Remove that trailing ; here.
+
+        if feature_type in TRANSCRIPT_TYPES:
+            parent_id = [ info_field for info_field in feature_info if info_field.startswith(transcript_parent_format) ];
+            feature_id = [ info_field for info_field in feature_info if info_field.startswith(transcript_id_format) ];
+            # Get the gene ID associated with the transcript as a list of fields with the "Parent=" prefix, and the feature ID
+            # as a list of fields with the "ID=" prefix
+
+            if len(parent_id) != 1:
+                yield ("error", line, feature_info, parent_id, "transcript parent id parsing");
+                return;
+            if len(feature_id) != 1:
+                yield ("error", line, feature_info, feature_id, "transcript id parsing");
+                return;
+            # A quick check to make sure we have read only one ID
+
+            yield ("transcript", feature_id[0].replace(transcript_id_format, "").replace("\"", ""), seq_header, start, end, strand, parent_id[0].replace(transcript_parent_format, "").replace("\"", ""));
+            # Unpack and parse the IDs
+
+        else:
+            parent_id = [ info_field for info_field in feature_info if info_field.startswith(exon_parent_format) ];
+            # Get the transcript ID associated with the exon as a list of fields with the "Parent=" prefix
+
+            if len(parent_id) != 1:
+                yield ("error", line, feature_info, parent_id, "CDS parent id parsing");
+                return;
+            # A quick check to make sure we have read only one ID
+
+            yield ("CDS", parent_id[0].replace(exon_parent_format, "").replace("\"", ""), start, end, strand, phase);
+            # Unpack and parse the transcript ID
 
-            feature_type, seq_header, start, end, strand, phase, feature_info = line[2], line[0], int(line[3]), int(line[4]), line[6], line[7], line[8].split(info_field_splitter);
-            # Unpack the pertinent information from the current line into more readable variables.
+#############################################################################
 
-            feature_info = list(filter(None, feature_info));
-            # Remove empty strings from the feature list in case the gff field has a trailing semicolon
+def readRange(gxf_file, compression, blocks, start, end):
+# Reads the lines that start between the byte positions start and end (in the uncompressed data) of an uncompressed or BGZF
+# annotation file. The line that spans the start of the range belongs to the previous range, and the line that spans the
+# end of the range is read to its end.
 
-            if feature_info[-1][-1] == ";":
-                feature_info[-1] = feature_info[-1][:-1];
-            # For gtf files, the field splitter includes a space ("; "), meaning the last entry of feature_info will still contain a ; (since it ends ";\n")
-            # Remove that trailing ; here.
+    if compression == "bgzf":
+        gxf_stream = BGZF.BGZFReader(gxf_file, blocks);
+    else:
+        gxf_stream = open(gxf_file, "rb");
+
+    try:
+        read_start = max(start - 1, 0);
+        gxf_stream.seek(read_start);
+        data = gxf_stream.read(end - read_start);
+        # Read from one byte before the start of the range to check whether the range starts at the beginning of a line
+
+        if start > 0:
+            line_end = data.find(b"\n");
+            if line_end == -1:
+                return b"";
+            data = data[line_end+1:];
+        # Skip the end of the line started in the previous range. If there is no line break, the whole range is in a line
+        # that belongs to the previous range
+
+        rest = [];
+        while data and not data.endswith(b"\n"):
+            chunk = gxf_stream.read(2**16);
+            if not chunk:
+                break;
+            line_end = chunk.find(b"\n");
+            if line_end != -1:
+                rest.append(chunk[:line_end+1]);
+                break;
+            rest.append(chunk);
+        # Read to the end of the last line in the range
+    finally:
+        gxf_stream.close();
 
+    return data + b"".join(rest);
 
-            if feature_type in feature_list:
-            # Skipping any 'unconfirmed_transcript'
+#############################################################################
 
-                parent_id = [ info_field for info_field in feature_info if info_field.startswith(parent_id_format) ];
-                # Get the gene ID associated with the transcript as a list of fields with the "Parent=" prefix
+def parseRange(range_args):
+# Parses the lines in one byte range of the annotation file. Run by the worker processes with -p.
 
-                checkIDs(line, feature_info, parent_id, feature_list[0] +" parent id parsing", globs);
-                # A quick check to make sure we have read only one ID
+    gxf_file, compression, blocks, start, end, formats, info_field_splitter = range_args;
+    return list(parseLines(readRange(gxf_file, compression, blocks, start, end).split(b"\n"), formats, info_field_splitter));
 
-                parent_id = parent_id[0].replace(parent_id_format, "").replace("\"", "");
-                # Unpack and parse the gene ID
+#############################################################################
 
-                feature_len = end - start;
+def splitRanges(globs):
+# Splits the annotation file into byte ranges to be parsed in parallel with -p. Returns the list of BGZF blocks (or False
+# for uncompressed files) and the list of ranges, or False if the file is too small to be worth splitting.
 
-                if feature_list[0] == "transcript":                  
+    if globs['gxf-compression'] == "bgzf":
+        blocks = BGZF.getBlocks(globs['gxf-file']);
+        bgzf_stream = BGZF.BGZFReader(globs['gxf-file'], blocks);
+        file_size = blocks[-1][1] + len(bgzf_stream.readBlock(len(blocks) - 1));
+        bgzf_stream.close();
+    # The uncompressed size of a BGZF file is the uncompressed offset of the last block plus the size of that block
+    else:
+        blocks = False;
+        file_size = os.path.getsize(globs['gxf-file']);
 
-                    feature_id = [ info_field for info_field in feature_info if info_field.startswith(id_format) ];
-                    # Get the feature ID as a list of fields with the "ID=" prefix
-                
-                    checkIDs(line, feature_info, feature_id, feature_list[0] +" id parsing", globs);
-                    # A quick check to make sure we have read only one ID
+    if file_size < PARALLEL_MIN_SIZE:
+        return blocks, False;
 
-                    feature_id = feature_id[0].replace(id_format, "").replace("\"", "");
-                    # Unpack and parse the ID
+    num_ranges = min(globs['num-procs'] * 4, file_size // (PARALLEL_MIN_SIZE // 4));
+    range_size = -(-file_size // num_ranges);
+    # Use a few ranges per process so the work is balanced if features are unevenly spread through the file
 
-                    if feature_len < globs['min-len']:
-                        CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + feature_id + " has a length shorter than the minimum specified and will be excluded from all calculations (" + str(feature_len) + " < " + str(globs['min-len']) + ")");
-                        globs['short-transcripts'].append(feature_id);
-                        globs['warnings'] += 1;                    
-                        continue;
-                    # If the transcript has 0 length for some reason, downstream stuff will be messed up and it should be excluded anyway, so we throw a warning about it
-                    # and skip adding it to the annotation dict
+    return blocks, [ (start, min(start + range_size, file_size)) for start in range(0, file_size, range_size) ];
 
-                    globs['annotation'][feature_id] = { 'header' : seq_header, 'start' : start, 'end' : end, 'len' : feature_len, 'longest' : "no", 'cdslen': 0, 'strand' : strand, 
-                                                        'exons' : {}, "gene-id" : parent_id, 'start-frame' : None, 'coding-start' : None, 'keep' : True,
-                                                        0 : 0, 2 : 0, 3 : 0, 4 : 0 };
-                    # Add the ID and related info to the annotation dict. This includes an empty dict for exons to be stored in a similar way
-                    # The last 4 entries are counts for number of sites with each degeneracy to summarize transcripts
+#############################################################################
 
-                    try: 
-                        globs['genekey'][parent_id].append(feature_id);
-                    except KeyError:
-                        globs['genekey'][parent_id] = [feature_id];
-                    # Make a dict of that includes all the transcript ids associated with a geneid
+def addFeatures(globs, features):
+# Adds the transcripts and coding exons parsed by parseLines() to the annotation dict, in the order they appear in the file.
+# CDS lines that appear before their transcript are held until the transcript is read.
 
-                elif feature_list[0] == "CDS":
-                    
-                    if parent_id in globs['short-transcripts']:
-                        continue;
-                    # Skip exons that have a 0 length transcript as a parent (and are likely 0 length themselves)
+    num_transcripts, num_cds_exons = 0, 0;
+    pending_cds = {};
+    # CDS exons whose transcript hasn't been read yet, by transcript ID
 
-                    try: 
-                        num_exons = len(globs['annotation'][parent_id]['exons']);
-                    except KeyError:
-                        continue;
-                    #if we find a CDS without an associated transcript, skip it
+    for feature in features:
+        if feature[0] == "transcript":
+            feature_id, seq_header, start, end, strand, parent_id = feature[1:];
+            feature_len = end - start;
 
-                    exon_id = "exon-" + str(num_exons+1);
-                    # Because exon IDs are not always included for CDS, or they only represent the CDS as a whole (e.g. protein ID from Ensembl), we 
-                    # count the number of exons in the transcript as the ID
+            if feature_len < globs['min-len']:
+                CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + feature_id + " has a length shorter than the minimum specified and will be excluded from all calculations (" + str(feature_len) + " < " + str(globs['min-len']) + ")");
+                globs['short-transcripts'].append(feature_id);
+                globs['warnings'] += 1;                    
+                continue;
+            # If the transcript has 0 length for some reason, downstream stuff will be messed up and it should be excluded anyway, so we throw a warning about it
+            # and skip adding it to the annotation dict
+
+            transcript = Transcript(seq_header, start, end, strand, parent_id);
+            if feature_id in globs['annotation']:
+                transcript.takeExons(globs['annotation'][feature_id]);
+            # If a transcript ID is repeated, the later transcript replaces the earlier one but keeps the coding exons already read for it
+
+            globs['annotation'][feature_id] = transcript;
+            # Add the ID and related info to the annotation dict
+
+            try: 
+                globs['genekey'][parent_id].append(feature_id);
+            except KeyError:
+                globs['genekey'][parent_id] = [feature_id];
+            # Make a dict of that includes all the transcript ids associated with a geneid
+
+            num_transcripts += 1;
+
+            for exon in pending_cds.pop(feature_id, []):
+                transcript.addExon(*exon);
+                num_cds_exons += 1;
+            # Add any coding exons for this transcript that were read before it
+
+        elif feature[0] == "CDS":
+            parent_id = feature[1];
+            if parent_id in globs['annotation']:
+                globs['annotation'][parent_id].addExon(*feature[2:]);
+                num_cds_exons += 1;
+            else:
+                pending_cds.setdefault(parent_id, []).append(feature[2:]);
+            # Add the exon to its transcript, or hold it until the transcript is read
 
-                    globs['annotation'][parent_id]['exons'][exon_id] = { 'header' : seq_header, 'start' : start, 'end' : end, 'len' : end-start, 'strand' : strand, 'phase' :  phase};
-                    globs['annotation'][parent_id]['cdslen'] += end-start+1;
-                # Add the ID and related info to the annotation dict.                   
+        elif feature[0] == "error":
+            checkIDs(*feature[1:], globs);
 
-                num_features += 1;
-                # Add to the number of transcripts read
+        elif feature[0] == "fasta":
+            break;
+        # Stop at the sequences at the end of Maker GFF files
+    ## End feature loop
+    # Any CDS exons still held at the end either have a transcript that was too short, or no transcript at all, and are skipped
 
-    return globs, num_features;
+    return globs, num_transcripts, num_cds_exons;
 
 #############################################################################
 
@@ -135,8 +316,8 @@ def getLongest(globs):
         longest_cds = 0;
         longest_mrna = 0;
         for transcript_feature in sorted(globs['genekey'][gene_feature]):
-            cds_len = globs['annotation'][transcript_feature]['cdslen']
-            mrna_len = globs['annotation'][transcript_feature]['len']
+            cds_len = globs['annotation'][transcript_feature].cdslen
+            mrna_len = globs['annotation'][transcript_feature].len
             if cds_len > longest_cds:
                 longest_cds = cds_len;
                 longest_mrna = mrna_len;
@@ -148,72 +329,374 @@ def getLongest(globs):
             else:
                 continue;
 
-        globs['annotation'][longest_transcript]['longest'] = "yes";
+        globs['annotation'][longest_transcript].longest = "yes";
     
     return globs
 
 #############################################################################
 
+def cacheFile(gxf_file):
+# The name of the cache file for an annotation file
+    return gxf_file + ".dac";
+
+#############################################################################
+
+def cacheKey(globs):
+# The annotation file and the options that the parsed annotation depends on. A cache is only used if its key matches
+    gxf_stat = os.stat(globs['gxf-file']);
+    return (CACHE_VERSION, os.path.abspath(globs['gxf-file']), gxf_stat.st_size, gxf_stat.st_mtime_ns, globs['min-len'], globs['gxf-type']);
+
+#############################################################################
+
+def readCache(globs):
+# Loads the parsed annotation from the cache file if it exists and matches the current annotation file and options
+# Returns the number of transcripts and coding exons in the cache, or False if the cache can't be used
+
+    cache_file = cacheFile(globs['gxf-file']);
+    if not os.path.isfile(cache_file):
+        return False;
+
+    try:
+        with open(cache_file, "rb") as cache_stream:
+            if pickle.load(cache_stream) != cacheKey(globs):
+                return False;
+            # The key is stored first so an out of date cache can be rejected without loading the rest of it
+
+            cache = pickle.load(cache_stream);
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+        return False;
+    # A cache that can't be read is rebuilt
+
+    globs['annotation'], globs['genekey'], globs['short-transcripts'] = cache['annotation'], cache['genekey'], cache['short-transcripts'];
+
+    return cache['num-transcripts'], cache['num-cds-exons'];
+
+#############################################################################
+
+def writeCache(globs, num_transcripts, num_cds_exons):
+# Saves the parsed annotation to the cache file. The cache is written to a temporary file which is then moved into place,
+# so other runs never see a partial cache. Returns False if the cache couldn't be written
+
+    cache_file = cacheFile(globs['gxf-file']);
+    tmp_file = cache_file + "." + str(os.getpid()) + ".tmp";
+
+    cache = { 'annotation' : globs['annotation'], 'genekey' : globs['genekey'], 'short-transcripts' : globs['short-transcripts'],
+              'num-transcripts' : num_transcripts, 'num-cds-exons' : num_cds_exons };
+
+    try:
+        with open(tmp_file, "wb") as cache_stream:
+            pickle.dump(cacheKey(globs), cache_stream, protocol=pickle.HIGHEST_PROTOCOL);
+            pickle.dump(cache, cache_stream, protocol=pickle.HIGHEST_PROTOCOL);
+        os.replace(tmp_file, cache_file);
+    except OSError:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file);
+        return False;
+    # If the directory isn't writable, the annotation is still read for this run
+
+    return True;
+
+#############################################################################
+
+def mergeIntervals(intervals):
+# Sorts a list of (start, end) intervals and merges the ones that overlap or touch
+
+    merged = [];
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end);
+        else:
+            merged.append([start, end]);
+
+    return merged;
+
+#############################################################################
+
+def tabixIndex(gxf_file):
+# Returns the tabix index (.tbi or .csi) of a bgzipped annotation file, or False if it doesn't have one
+
+    for index_ext in [".tbi", ".csi"]:
+        if os.path.isfile(gxf_file + index_ext):
+            return gxf_file + index_ext;
+
+    return False;
+
+#############################################################################
+
+def fetchRegions(globs, tabix_file):
+# Reads only the lines of a tabix indexed annotation file that are needed for the regions given with -r. Yields the lines as
+# bytes for parseLines(), in the same order as they are in the (sorted) file.
+# Each BED interval is first widened to cover the genes and transcripts that overlap it, so all of the coding exons of those
+# transcripts (and all of the transcripts of those genes, for choosing the longest) are read. Transcripts that were read
+# because of the widening but don't overlap the interval are removed later by filterTranscripts().
+
+    contig_order = { contig : i for i, contig in enumerate(tabix_file.contigs) };
+    regions = sorted([ region for region in globs['regions'] if region in contig_order ], key=lambda region : contig_order[region]);
+    # Regions that aren't in the index have no features
+
+    for region in regions:
+        if globs['regions'][region] is None:
+            for line in tabix_file.fetch(region):
+                yield line.encode();
+            continue;
+        # Read all lines for whole regions
+
+        windows = [];
+        for start, end in mergeIntervals(globs['regions'][region]):
+            window_start, window_end = start, end;
+            for line in tabix_file.fetch(region, start, end):
+                fields = line.split("\t", 5);
+                if fields[2] in WINDOW_TYPES:
+                    window_start, window_end = min(window_start, int(fields[3]) - 1), max(window_end, int(fields[4]));
+            windows.append((window_start, window_end));
+        # Widen each interval to the genes and transcripts that overlap it
+
+        yielded = set();
+        for start, end in mergeIntervals(windows):
+            next_yielded = set();
+            for line in tabix_file.fetch(region, start, end):
+                feature_end = int(line.split("\t", 5)[4]);
+                if feature_end > end:
+                    next_yielded.add(line);
+                # Features that extend past this window will also be fetched for the next one
+
+                if line not in yielded:
+                    yield line.encode();
+            yielded = next_yielded;
+        # Read the lines in the widened intervals, skipping any features that span two intervals the second time they are fetched
+    ## End region loop
+
+#############################################################################
+
+def inIntervals(intervals, start, end):
+# Checks whether the interval from start to end (0-based, end exclusive) overlaps any of the intervals, given as sorted lists of
+# the starts and ends of non-overlapping intervals
+
+    starts, ends = intervals;
+    i = bisect_right(ends, start);
+    return i < len(starts) and starts[i] < end;
+    # The first interval that ends after the start overlaps if it starts before the end
+
+#############################################################################
+
+def filterTranscripts(globs):
+# Removes transcripts from the annotation that are outside of the regions given with -r, that aren't in the list of transcript
+# or gene IDs given with -t, or that aren't the longest transcript of their gene with --longest-only. This is done right after the
+# annotation is read so no CDS are extracted or processed for the transcripts that are removed. The longest transcript of each
+# gene is still chosen from all of its transcripts.
+
+    step = "Filtering transcripts";
+    step_start_time = CORE.report_step(globs, step, False, "In progress...");
+    num_transcripts = len(globs['annotation']);
+
+    region_intervals = {};
+    if globs['regions']:
+        for region, intervals in globs['regions'].items():
+            if intervals is None:
+                region_intervals[region] = None;
+            else:
+                merged = mergeIntervals(intervals);
+                region_intervals[region] = ([ interval[0] for interval in merged ], [ interval[1] for interval in merged ]);
+        # Merge overlapping BED intervals so overlaps can be checked with a binary search
+    # Whole regions are stored as None
+
+    found_ids = set();
+    for transcript in list(globs['annotation']):
+        transcript_info = globs['annotation'][transcript];
+
+        if globs['longest-only'] and transcript_info.longest != "yes":
+            del globs['annotation'][transcript];
+            continue;
+
+        if globs['regions']:
+            if transcript_info.header not in region_intervals:
+                del globs['annotation'][transcript];
+                continue;
+            intervals = region_intervals[transcript_info.header];
+            if intervals is not None and not inIntervals(intervals, transcript_info.start - 1, transcript_info.end):
+                del globs['annotation'][transcript];
+                continue;
+        # GXF coordinates are 1-based and inclusive, so subtract 1 from the start to compare to BED intervals
+
+        if globs['transcript-ids']:
+            if transcript in globs['transcript-ids']:
+                found_ids.add(transcript);
+            elif transcript_info.gene_id in globs['transcript-ids']:
+                found_ids.add(transcript_info.gene_id);
+            else:
+                del globs['annotation'][transcript];
+                continue;
+    ## End transcript loop
+
+    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(globs['annotation'])) + " of " + str(num_transcripts) + " transcripts kept");
+
+    if globs['transcript-ids'] and len(found_ids) < len(globs['transcript-ids']):
+        CORE.printWrite(globs['logfilename'], 3, "# WARNING: " + str(len(globs['transcript-ids']) - len(found_ids)) + " of the transcript or gene IDs given with -t were not found in the annotation (or were removed by another filter).");
+        globs['warnings'] += 1;
+    # Warn about IDs that didn't match anything, which may be a typo or an ID from a different annotation version
+
+    if not globs['annotation']:
+        CORE.errorOut("GXF3", "No transcripts are left after filtering with -r, -t, or --longest-only.", globs);
+
+    return globs;
+
+#############################################################################
+
+def getFormats(gxf_type):
+# Returns the transcript ID, transcript parent, and CDS parent formats and the info field splitter for parsing GFF or GTF files,
+# which outline the differences between them
+
+    if gxf_type == "gff":
+        return ("ID=", "Parent=", "Parent="), ";";
+    elif gxf_type == "gtf":
+        return ("transcript_id ", "gene_id ", "transcript_id "), "; ";
+
+#############################################################################
+
+def guessType(lines):
+# Guesses whether an annotation read from stdin is GFF or GTF from the first feature line, since there is no file
+# extension to go by. GTF attributes are written as 'key "value"' and GFF attributes as 'key=value'
+
+    for line in lines:
+        if line.startswith(b"##gff-version"):
+            return "gff";
+        if line[:1] == b"#" or not line.strip():
+            continue;
+
+        info = line.rstrip(b"\n").split(b"\t")[-1];
+        if b"gene_id \"" in info or b"transcript_id \"" in info:
+            return "gtf";
+        else:
+            return "gff";
+
+    return "gff";
+
+#############################################################################
+
 def read(globs):
 
+    if globs['annotation-cache']:
+        step = "Checking annotation cache";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+        cache_counts = readCache(globs);
+
+        if cache_counts:
+            num_transcripts, num_cds_exons = cache_counts;
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Cache hit: " + str(num_transcripts) + " transcripts and " + str(num_cds_exons) + " coding exons loaded");
+
+            if globs['short-transcripts']:
+                CORE.printWrite(globs['logfilename'], 3, "# WARNING: " + str(len(globs['short-transcripts'])) + " transcripts in the annotation cache have a length shorter than the minimum specified and will be excluded from all calculations");
+                globs['warnings'] += 1;
+            # The warnings for each short transcript were given when the cache was built
+
+            return globs;
+        else:
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Cache miss: annotation will be read and cached");
+    # With --annotation-cache, load the parsed annotation from the cache if it is up to date
+
     step = "Detecting compression of annotation file";
     step_start_time = CORE.report_step(globs, step, False, "In progress...");
     globs['gxf-compression'] = CORE.detectCompression(globs['gxf-file']);
     if globs['gxf-compression'] == "none":
-        reader = open;
-        readline = lambda l : l.strip().split("\t");
         step_start_time = CORE.report_step(globs, step, step_start_time, "Success: No compression detected");
     else:
-        reader = gzip.open;
-        readline = lambda l : l.decode().strip().split("\t");
         step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + globs['gxf-compression'] + " detected");
     # Detect the compression of the input annotation file
 
-    if globs['gxf-type'] == "gff":
-        field_splitter = ";";
-        gene_id_format = "ID=";
-        transcript_id_format = "ID=";
-        exon_id_format = "ID=";
-        transcript_parent_format = "Parent=";
-        exon_parent_format = "Parent=";
-
-    elif globs['gxf-type'] == "gtf":
-        field_splitter = "; ";
-        gene_id_format = "gene_id ";
-        transcript_id_format = "transcript_id ";
-        exon_id_format = "exon_id ";
-        transcript_parent_format = "gene_id ";
-        exon_parent_format = "transcript_id ";
-    # These outline the differences between GFF and GTF
+    if globs['gxf-file'] == "-" and globs['gxf-compression'] == "zip":
+        CORE.errorOut("GXF4", "Zip compressed annotations can't be read from stdin (-a -). Unzip the file first or use another compression.", globs);
+    # Zip archives need random access to read the list of files at the end of the archive
 
     globs['annotation'] = {};
-    # The main annotation storage dict. A nested structure for genes, transcripts, and coding exons.
-    # <transcript id> : { <header>, <start coord>, <end coord>, <strand>, 
-    #                       { <exon id> : <exon header>, <exon start coord>, <exon end coord>, <exon strand> } } }
+    # The main annotation storage dict, with a Transcript for each transcript ID that holds its coding exons
+    # <transcript id> : Transcript(<header>, <start coord>, <end coord>, <strand>, <gene id>, <exon starts>, <exon ends>, <exon phases> ...)
 
     ####################
 
-    step = "Reading transcripts";
-    step_start_time = CORE.report_step(globs, step, False, "In progress...");
-    globs, num_transcripts = readFeatures(globs, reader, readline, ["transcript", "mRNA", "V_gene_segment", "C_gene_segment"], transcript_id_format, transcript_parent_format, field_splitter);
-    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(num_transcripts) + " transcripts read");
+    tabix_file = False;
+    if globs['regions'] and globs['gxf-compression'] == "bgzf" and tabixIndex(globs['gxf-file']):
+        try:
+            from pysam import TabixFile
+            tabix_file = TabixFile(globs['gxf-file'], index=tabixIndex(globs['gxf-file']));
+        except ImportError:
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: the annotation file has a tabix index, but pysam is needed to read it. The whole annotation file will be read.");
+            globs['warnings'] += 1;
+        except (OSError, ValueError):
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: the tabix index of the annotation file could not be read. The whole annotation file will be read.");
+            globs['warnings'] += 1;
+    # With -r, only the regions are read from a sorted, bgzipped, and tabix indexed annotation file
+
+    ranges = False;
+    if not tabix_file and globs['num-procs'] > 1 and globs['gxf-compression'] in ["none", "bgzf"] and globs['gxf-file'] != "-":
+        blocks, ranges = splitRanges(globs);
+    # With -p, large uncompressed and BGZF files are split into byte ranges at line boundaries to be parsed in parallel
+
+    if tabix_file:
+        step = "Reading indexed annotation regions";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+
+        formats, field_splitter = getFormats(globs['gxf-type']);
+        globs, num_transcripts, num_cds_exons = addFeatures(globs, parseLines(fetchRegions(globs, tabix_file), formats, field_splitter));
+        tabix_file.close();
+
+    elif ranges:
+        step = "Reading transcripts and coding exons";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+
+        formats, field_splitter = getFormats(globs['gxf-type']);
+        range_args = [ (globs['gxf-file'], globs['gxf-compression'], blocks, start, end, formats, field_splitter) for start, end in ranges ];
+
+        with mp.Pool(processes=min(globs['num-procs'], len(ranges))) as pool:
+            range_features = pool.imap(parseRange, range_args);
+            globs, num_transcripts, num_cds_exons = addFeatures(globs, itertools.chain.from_iterable(range_features));
+        # imap() returns the features of each range in the same order as the ranges, so they are added to the annotation in
+        # the same order as the file, and the transcript order, genes, and exon order are the same as reading it in one process
 
-    # Read transcripts
-    ####################
+    else:
+        with DECOMP.openFile(globs['gxf-file'], globs['gxf-compression'], globs['num-procs']) as gxf_stream:
+        # The file is read as bytes, and compressed files are decompressed on a background thread
+
+            gxf_lines = gxf_stream;
+            if globs['gxf-file'] == "-":
+                first_lines = [];
+                for line in gxf_stream:
+                    first_lines.append(line);
+                    if line[:1] != b"#" and line.strip():
+                        break;
+                gxf_lines = itertools.chain(first_lines, gxf_stream);
+
+                if globs['gxf-type'] == "auto":
+                    globs['gxf-type'] = guessType(first_lines);
+                    CORE.printWrite(globs['logfilename'], globs['log-v'], "# Annotation read from stdin appears to be " + globs['gxf-type'].upper() + " formatted.");
+            # An annotation from stdin has no file extension, so the format is guessed from the header and first feature line
+
+            step = "Reading transcripts and coding exons";
+            step_start_time = CORE.report_step(globs, step, False, "In progress...");
+
+            formats, field_splitter = getFormats(globs['gxf-type']);
+            globs, num_transcripts, num_cds_exons = addFeatures(globs, parseLines(gxf_lines, formats, field_splitter));
 
-    step = "Reading coding exons";
-    step_start_time = CORE.report_step(globs, step, False, "In progress...");
-    globs, num_cds_exons = readFeatures(globs, reader, readline, ["CDS"], exon_id_format, exon_parent_format, field_splitter);
     globs = getLongest(globs);
-    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(num_cds_exons) + " coding exons read");
+    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(num_transcripts) + " transcripts and " + str(num_cds_exons) + " coding exons read");
 
-    # Read coding exons
+    # Read transcripts and coding exons
     ####################
 
     if num_cds_exons == 0:
         CORE.errorOut("GXF2", "No CDS exons found in input annotation file! Cannot calculate degeneracy without coding sequences.", globs);
     # Check to make sure at least one CDS sequence is found, otherwise error out
 
+    if globs['annotation-cache'] and not tabix_file:
+        step = "Writing annotation cache";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+        if writeCache(globs, num_transcripts, num_cds_exons):
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + cacheFile(globs['gxf-file']));
+        else:
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Failed");
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: the annotation cache could not be written next to the annotation file.");
+            globs['warnings'] += 1;
+    # Save the parsed annotation for later runs. Only part of the annotation is read with a tabix index, so it isn't cached
+
     return globs;
 
     #############################################################################
@@ -0,0 +1,174 @@
+#############################################################################
+# Functions to write the run manifest, which records the transcripts processed in a run and where their
+# output is in each output file, and to reuse the output of unchanged transcripts from a previous run
+# with --prev-run
+#############################################################################
+
+import os
+import hashlib
+import degenotate_lib.core as CORE
+
+#############################################################################
+
+OUTPUTS = ["bed", "mk", "seq"];
+# The output files with rows for each transcript that can be copied from a previous run. The transcript
+# summary rows are re-written from the fold counts in the manifest since the gene and longest transcript
+# columns can change when other transcripts change
+
+#############################################################################
+
+def runOptions(globs):
+# The options that change the output for a transcript. The output from a previous run is only reused
+# if all of these are the same
+
+    if globs['vcf-file']:
+        vcf_stat = os.stat(globs['vcf-file']);
+        vcf_id = [ os.path.abspath(globs['vcf-file']), str(vcf_stat.st_size), str(vcf_stat.st_mtime_ns) ];
+    else:
+        vcf_id = [];
+    # The VCF file is identified by its path, size, and modification time
+
+    return [ ("version", globs['version']),
+             ("input", "annotation" if globs['gxf-file'] else "cds-coords" if globs['cds-coords'] else "cds"),
+             ("codon-methods", ",".join(globs['codon-methods'])),
+             ("extract-fold", ",".join(globs['extract-fold'])),
+             ("vcf", ",".join(vcf_id)),
+             ("vcf-ingroups", ",".join(globs['vcf-ingroups'])),
+             ("vcf-outgroups", ",".join(globs['vcf-outgroups'] or [])),
+             ("vcf-exclude", ",".join(globs['vcf-exclude'])),
+             ("vcf-polarized", str(globs['vcf-polarized'])),
+             ("sfs", str(globs['sfs'])),
+             ("ingroup-maf-cutoff", str(globs['ingroup-maf-cutoff'])),
+             ("imp-maf-cutoff", str(globs['imp-maf-cutoff'])),
+             ("count-fixed-alt-ingroups", str(globs['count-fixed-alt-ingroups'])) ];
+
+#############################################################################
+
+def transcriptSignature(globs, transcript):
+# A hash of everything that determines the output of a transcript: its genome region, strand, coding exons
+# and their phases, and the CDS sequence itself. Including the sequence means a transcript is processed again
+# if the genome changed where it is
+
+    signature = hashlib.md5();
+    if globs['gxf-file']:
+        exons = globs['annotation'][transcript];
+        signature.update("\t".join([exons.header, exons.strand, exons.exon_strands, ""]).encode());
+        signature.update(exons.exon_starts.tobytes());
+        signature.update(exons.exon_ends.tobytes());
+        signature.update(exons.exon_phases.tobytes());
+    elif globs['cds-coords']:
+        coord_map = globs['coords'][transcript];
+        signature.update("\t".join([globs['annotation'][transcript].header, coord_map.strand, ""]).encode());
+        signature.update(coord_map.genome_starts.tobytes());
+        signature.update(coord_map.lens.tobytes());
+    # With --cds-coords, the genome region, strand, and blocks of the CDS are used instead of the exons
+    signature.update(globs['cds-seqs'][transcript].encode());
+
+    return signature.hexdigest();
+
+#############################################################################
+
+def outputStarts(out_streams):
+# Gets the current position in each output file, where the output for the next transcript starts
+
+    return { out : out_streams[out].tell() for out in out_streams };
+
+#############################################################################
+
+def manifestRow(transcript, signature, summary, starts, out_streams):
+# Compiles the manifest line for a transcript once its output has been written
+
+    row = [ transcript, signature ] + [ str(summary[fold]) for fold in summary ];
+    for out in OUTPUTS:
+        if out in out_streams:
+            row += [ str(starts[out]), str(out_streams[out].tell()) ];
+        else:
+            row += [ "NA", "NA" ];
+
+    return "\t".join(row) + "\n";
+
+#############################################################################
+
+def writeManifest(globs, manifest_rows, out_files):
+# Writes the run manifest next to the other outputs, after the output files have been closed
+
+    with open(globs['outmanifest'], "w") as manifestfile:
+        manifestfile.write("##degenotate-manifest\t1\n");
+        for opt, value in runOptions(globs):
+            manifestfile.write("##option\t" + opt + "\t" + value + "\n");
+        for out in out_files:
+            manifestfile.write("##file\t" + out + "\t" + os.path.basename(out_files[out]) + "\t" + str(os.path.getsize(out_files[out])) + "\n");
+        # The options and the output files and their sizes
+
+        manifestfile.write("\t".join(["transcript", "signature", "f0", "f2", "f3", "f4"] + [ out + pos for out in OUTPUTS for pos in ["_start", "_end"] ]) + "\n");
+        manifestfile.writelines(manifest_rows);
+        # One line for each transcript
+
+#############################################################################
+
+def readPrevRun(globs):
+# Reads the manifest of the previous run given with --prev-run and opens its output files. Returns empty
+# dictionaries if the previous output can't be reused
+
+    prev_dir = globs['prev-run'];
+    if len(globs['gxf-files']) > 1:
+        prev_dir = os.path.join(prev_dir, os.path.basename(os.path.dirname(globs['outbed'])));
+    # With several annotation files, the previous output for each is in the subdirectory with the same name
+
+    manifest_file = os.path.join(prev_dir, os.path.basename(globs['outmanifest']));
+    if not os.path.isfile(manifest_file):
+        CORE.printWrite(globs['logfilename'], 3, "# WARNING: no run manifest found in the previous run directory (--prev-run): " + prev_dir + ". All transcripts will be processed.");
+        globs['warnings'] += 1;
+        return {}, {};
+    # Runs with --stdout don't write a manifest
+
+    prev_transcripts, prev_options, prev_files = {}, [], {};
+    with open(manifest_file) as manifestfile:
+        for line in manifestfile:
+            line = line.rstrip("\n").split("\t");
+            if line[0] == "##option":
+                prev_options.append((line[1], line[2]));
+            elif line[0] == "##file":
+                prev_files[line[1]] = (os.path.join(prev_dir, line[2]), int(line[3]));
+            elif line[0] == "transcript" or line[0].startswith("##"):
+                continue;
+            else:
+                prev_transcripts[line[0]] = { 'signature' : line[1],
+                                              'summary' : { fold : int(count) for fold, count in zip([0, 2, 3, 4], line[2:6]) },
+                                              'pos' : { out : (int(line[6+i*2]), int(line[7+i*2])) for i, out in enumerate(OUTPUTS) if line[6+i*2] != "NA" } };
+    # Read the options, output files, and transcripts from the previous run
+
+    changed_options = [ opt for opt, value in runOptions(globs) if (opt, value) not in prev_options ];
+    if changed_options:
+        CORE.printWrite(globs['logfilename'], 3, "# WARNING: options differ from the previous run (--prev-run): " + ", ".join(changed_options) + ". All transcripts will be processed.");
+        globs['warnings'] += 1;
+        return {}, {};
+    # Only reuse the previous output if it was made with the same options
+
+    prev_streams = {};
+    for out in prev_files:
+        prev_file, prev_size = prev_files[out];
+        if not os.path.isfile(prev_file) or os.path.getsize(prev_file) != prev_size:
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: output file from the previous run (--prev-run) is missing or has changed: " + prev_file + ". All transcripts will be processed.");
+            globs['warnings'] += 1;
+            for prev_stream in prev_streams.values():
+                prev_stream.close();
+            return {}, {};
+        prev_streams[out] = open(prev_file, "rb");
+    # Open the previous output files, checking that they are the same size as when the manifest was written
+
+    return prev_transcripts, prev_streams;
+
+#############################################################################
+
+def reuseOutput(prev_transcript, prev_streams, out_streams):
+# Copies the output rows of an unchanged transcript from the previous run to the current output files
+
+    for out in out_streams:
+        start, end = prev_transcript['pos'][out];
+        prev_streams[out].seek(start);
+        out_streams[out].write(prev_streams[out].read(end - start).decode());
+
+    return dict(prev_transcript['summary']);
+
+#############################################################################
@@ -22,10 +22,11 @@ def optParse(globs):
 
     parser = argparse.ArgumentParser(description="degenotate: Annotation of codon degeneracy for coding sequences");
 
-    parser.add_argument("-a", dest="annotation_file", help="A gff or gtf file that contains the coordinates of transcripts in the provided genome file (-g). Only one of -a/-g OR -s is REQUIRED.", default=False);
-    parser.add_argument("-g", dest="genome_file", help="A FASTA file containing a genome. -a must also be specified. Only one of -a/-g OR -s is REQUIRED.", default=False);
+    parser.add_argument("-a", dest="annotation_file", help="A gff or gtf file that contains the coordinates of transcripts in the provided genome file (-g). Only one of -a/-g OR -s is REQUIRED. Can be given more than once to run several annotations of the same genome, which is only read once. The outputs for each annotation are written to a subdirectory of the output directory named after the annotation file.", action="append", default=[]);
+    parser.add_argument("-g", dest="genome_file", help="A FASTA file containing a genome. -a must also be specified. Only one of -a/-g OR -s is REQUIRED. Uncompressed and bgzipped genomes are read through a .fai index (and .gzi index for bgzip), which will be built if it doesn't exist.", default=False);
 
     parser.add_argument("-s", dest="in_seq", help="Either a directory containing individual, in-frame coding sequence files or a single file containing multipl in-frame coding sequences on which to calculate degeneracy. Only one of -a/-g OR -s is REQUIRED.", default=False);
+    parser.add_argument("--cds-coords", dest="cds_coords", help="The file of CDS genome coordinates written next to the -c or -l output (<CDS file>.coords.tsv). Use with -s on that CDS file to write the output in genome coordinates and to use a VCF file (-v) without the genome.", default=False);
     
     parser.add_argument("-v", dest="vcf_file", help="Optional VCF file with in and outgroups to output polymorphic and fixed differences for MK tests. The VCF should contain SNPs only (no indels or structural variants).", default=False);
     parser.add_argument("-u", dest="vcf_outgroups", help="A comma separated list of sample IDs in the VCF file that make up the outgroup (e.g. 'sample1,sample2') or a file with one sample per line.", default=False);
@@ -34,23 +35,32 @@ def optParse(globs):
     # Input
 
     parser.add_argument("-o", dest="out_dest", help="Desired output directory. This will be created for you if it doesn't exist. Default: degenotate-[date]-[time]", default=False);
+    parser.add_argument("--stdout", dest="stdout_output", help="Write one of the outputs to stdout instead of a file in the output directory, so degenotate can be used in a pipeline. Choose from: bed (the per-site degeneracy output), transcript, mk, or seq (the -x sequences). Default: bed. All logging and progress messages will be written to stderr.", nargs='?', const="bed", choices=["bed", "transcript", "mk", "seq"], default=False);
+    parser.add_argument("--haplotypes", dest="haplotypes_flag", help="Set this with a phased VCF file (-v) to apply the alleles of each haplotype of each sample (except those excluded with -e) to the CDS. The in-frame CDS of every haplotype and its site counts are written to haplotype-cds.fa and haplotype-counts.tsv. Heterozygous genotypes that aren't phased are left as the reference.", action="store_true", default=False);
     parser.add_argument("-sfs", dest="sfs", help="Set this to output raw allele frequencies in the mk table)", action='store_true', default=False)
     # Output
 
     parser.add_argument("-d", dest="seq_delim", help="degenotate assumes the chromosome IDs in the GFF file exactly match the sequence headers in the FASTA file. If this is not the case, use this to specify a character at which the FASTA headers will be trimmed.", default=False);
-    parser.add_argument("-c", dest="write_cds", help="If a file is provided, the program will extract CDS sequences from the genome and write them to the file and exit. If no file is given with the option, a file with the name of 'cds-nt.fa' will be written to the output directory. Equivalent to '-x 0234' except this stops the program before calculating degeneracy.", nargs='?', const="default", default=False);
+    parser.add_argument("-c", dest="write_cds", help="If a file is provided, the program will extract CDS sequences from the genome and write them to the file and exit. If no file is given with the option, a file with the name of 'cds-nt.fa' will be written to the output directory. The genome coordinates of each CDS are written to <file>.coords.tsv for use with --cds-coords. Equivalent to '-x 0234' except this stops the program before calculating degeneracy.", nargs='?', const="default", default=False);
     parser.add_argument("-ca", dest="write_cds_aa", help="The same as -c, but writes translated amino acid sequences instead. Both -c and -ca can be specified. Default file name is 'cds-aa.fa'.", nargs='?', const="default", default=False);
     parser.add_argument("-l", dest="write_longest", help="If a file is provided, the program will extract CDS sequences from the longest transcript for each gene and write them to the file and exit. If no file is given with the option, a file with the name of 'cds-nt-longest.fa' will be written to the output directory. Both -c and -l can be specified.", nargs='?', const="default", default=False);
     parser.add_argument("-la", dest="write_longest_aa", help="The same as -l, but writes translated amino acid sequences instead. Both -l and -la can be specified. Default file name is 'cds-aa-longest.fa'.", nargs='?', const="default", default=False);
     parser.add_argument("-x", dest="extract_seq", help="Extract sites of a certain degeneracy. For instance, to extract 4-fold degenerate sites enter '4'. To extract 2- and 4-fold degenerate sites enter '24' and so on.", default=False);
     parser.add_argument("-m", dest="min_length", help="The minimum length of a transcript for it to be counted. Default (and global min): 3", default=False);
+    parser.add_argument("-r", dest="regions", help="A comma separated list of genome regions (e.g. chromosomes) from the annotation file (-a), or a file with one region per line or a BED file. Only transcripts in these regions (or overlapping the BED intervals) will be processed. For a bgzipped annotation file with a tabix index, only these regions are read from the file.", default=False);
+    parser.add_argument("-t", dest="transcript_ids", help="A comma separated list of transcript or gene IDs from the annotation file (-a), or a file with one ID per line. Only these transcripts (or the transcripts of these genes) will be processed.", default=False);
+    parser.add_argument("--longest-only", dest="longest_only_flag", help="Set this to only process the longest transcript of each gene (by CDS length, then transcript length), as written by -l.", action="store_true", default=False);
     parser.add_argument("-maf", dest="maf_cutoff", help="The minor allele frequency cutoff for MK tests. Sites where alternate alleles in the ingroup are below this frequency will be excluded. Default: 1 / 2N, where N is the number of ingroup samples", default=False);
     parser.add_argument("-imp", dest="imp_cutoff", help="The minor allele frequency cutoff that distinguishes low and high allele frequencies for imputed MK test. Only used if provided VCF is polarized. Default: 0.15", default=False);
 
-#parser.add_argument("-p", dest="num_procs", help="The total number of processes that degenotate can use. Default: 1.", type=int, default=1);
+    parser.add_argument("-p", dest="num_procs", help="The total number of processes that degenotate can use. Currently used to read directories of CDS files (-s), to decompress compressed inputs, to parse large uncompressed or bgzipped annotation files, and to extract the CDS of large annotations. Default: 1.", default=False);
     # User params
 
     parser.add_argument("--no-fixed-in", dest="no_fixed_in_flag", help="Set this if you wish to exclude sites from the MK test in which all ingroup samples share the same alternate allele (only the reference differs).", action="store_true", default=False);
+    parser.add_argument("--stream", dest="stream_flag", help="Set this to extract and process the CDS from one genome region (e.g. chromosome) at a time with -a/-g, so only one region is held in memory at once. Output will be grouped by region. With -c, -ca, -l, or -la, the CDS are written one region at a time. With -s, CDS are read and processed one sequence at a time.", action="store_true", default=False);
+    parser.add_argument("--genome-cache", dest="genome_cache_flag", help="Set this to convert the genome (-g) into a packed, memory-mapped cache file (<genome file>.dgc) the first time it is used and read exons from the cache on later runs. The cache is rebuilt if the genome file changes.", action="store_true", default=False);
+    parser.add_argument("--annotation-cache", dest="annotation_cache_flag", help="Set this to save the transcripts and coding exons read from the annotation file (-a) to a cache file (<annotation file>.dac) and load them from the cache on later runs. The cache is rebuilt if the annotation file, -m, or the annotation type changes.", action="store_true", default=False);
+    parser.add_argument("--prev-run", dest="prev_run", help="The output directory of a previous run of degenotate. Transcripts whose coding exons, genome region, and CDS sequence are unchanged since that run will have their output copied from it instead of being processed again. The previous run must have been done with the same options.", default=False);
     parser.add_argument("--overwrite", dest="ow_flag", help="Set this to overwrite existing files.", action="store_true", default=False);
     parser.add_argument("--appendlog", dest="append_log_flag", help="Set this to keep the old log file even if --overwrite is specified. New log information will instead be appended to the previous log file.", action="store_true", default=False);
     # User options
@@ -99,17 +109,33 @@ def optParse(globs):
     if args.annotation_file:
         if not args.genome_file:
             CORE.errorOut("OP2", "A genome fasta file be specified with -g when an annotation file is given with -g", globs);
-        globs['gxf-file'] = args.annotation_file;
         globs['fa-file'] = args.genome_file;
 
-        if any(globs['gxf-file'].endswith(gff_ext) for gff_ext in ['.gff', '.gff.gz', '.gff3', '.gff3.gz']):
-            globs['gxf-type'] = 'gff';
-        elif any(globs['gxf-file'].endswith(gtf_ext) for gtf_ext in ['.gtf', '.gtf.gz']):
-            globs['gxf-type'] = 'gtf';
-        else:
-            CORE.errorOut("OP3", "Cannot guess annotation file type from extension. Make sure it ends with '.gff' or '.gtf'.", globs);
-        # Guess whether the input annotation file is GFF or GTF from the file extension
-        # TODO: Can probably do this better, or let the user specify an option
+        if len(args.annotation_file) > 1 and "-" in args.annotation_file:
+            CORE.errorOut("OP21", "An annotation can only be read from stdin (-a -) when a single annotation file is given.", globs);
+
+        for gxf_file in args.annotation_file:
+            if gxf_file == "-":
+                gxf_type = 'auto';
+            # The type of an annotation read from stdin is guessed when it is read
+            else:
+                gxf_base = CORE.removeCompressionExt(gxf_file);
+                # Remove any compression extension before checking the annotation extension
+
+                if any(gxf_base.endswith(gff_ext) for gff_ext in ['.gff', '.gff3']):
+                    gxf_type = 'gff';
+                elif gxf_base.endswith('.gtf'):
+                    gxf_type = 'gtf';
+                else:
+                    CORE.errorOut("OP3", "Cannot guess annotation file type from extension. Make sure it ends with '.gff' or '.gtf' (optionally followed by '.gz', '.bz2', '.zst', or '.zip'): " + gxf_file, globs);
+            # Guess whether the input annotation file is GFF or GTF from the file extension
+            # TODO: Can probably do this better, or let the user specify an option
+
+            globs['gxf-files'].append([gxf_file, gxf_type, False]);
+        # With more than one -a, each annotation is run in turn. The output subdirectory for each is set below
+
+        globs['gxf-file'], globs['gxf-type'] = globs['gxf-files'][0][:2];
+        # The first annotation file is the current one
 
         if args.seq_delim:
             if args.seq_delim == 'space':
@@ -122,11 +148,23 @@ def optParse(globs):
 
     elif args.in_seq:
         globs['in-seq'] = args.in_seq;
-        if os.path.isfile(globs['in-seq']):
+        if globs['in-seq'] == "-" or os.path.isfile(globs['in-seq']):
             globs['in-seq-type'] = "file";
         elif os.path.isdir(globs['in-seq']):
             globs['in-seq-type'] = "directory";
-    # Save the input type as a global param
+    # Save the input type as a global param. A single file can be read from stdin with "-"
+
+    if args.cds_coords:
+        if not args.in_seq:
+            CORE.errorOut("OP23", "CDS coordinates (--cds-coords) can only be given with CDS sequences (-s).", globs);
+        globs['cds-coords'] = args.cds_coords;
+    elif args.in_seq and args.vcf_file:
+        CORE.errorOut("OP23", "A VCF file (-v) can only be used with CDS sequences (-s) if their genome coordinates are given with --cds-coords.", globs);
+    # The CDS coordinates written with -c or -l put the output of -s in genome coordinates, which is needed to read the VCF
+
+    if "-" in [args.genome_file, args.vcf_file]:
+        CORE.errorOut("OP17", "The genome (-g) and VCF (-v) files can't be read from stdin. Only the annotation (-a) or CDS (-s) input can be given as -.", globs);
+    # The genome and VCF need random access
 
     ####################
 
@@ -232,6 +270,67 @@ def optParse(globs):
             globs['min-len'] = min_len;
     # Parse the minimun transcript length option
 
+    if args.num_procs:
+        num_procs = CORE.isPosInt(args.num_procs);
+        if not num_procs:
+            CORE.errorOut("OP16", "The number of processes (-p) must be a positive integer.", globs);
+        else:
+            globs['num-procs'] = num_procs;
+    # Parse the number of processes option
+
+    ####################
+
+    if any((args.regions, args.transcript_ids, args.longest_only_flag)) and not globs['gxf-file']:
+        warnings.append("# WARNING: -r, -t, and --longest-only only apply to an annotation file (-a) and will be ignored.");
+    # The transcript filters are only used with an annotation file
+
+    elif args.regions:
+        if os.path.isfile(args.regions):
+            globs['regions'] = {};
+            for line in open(args.regions):
+                line = line.strip().split("\t");
+                if not line[0] or line[0][0] == "#" or line[0].split()[0] in ["track", "browser"]:
+                    continue;
+                # Skip blank, comment, and BED track lines
+
+                if len(line) >= 3:
+                    start, end = CORE.isPosInt(line[1], minval=0), CORE.isPosInt(line[2], minval=0);
+                    if start is False or end is False or end <= start:
+                        CORE.errorOut("OP19", "Invalid BED interval in the regions file (-r): " + "\t".join(line), globs);
+                    if globs['regions'].get(line[0], []) is not None:
+                        globs['regions'].setdefault(line[0], []).append((start, end));
+                # BED lines restrict the region to the interval. Intervals are 0-based and end exclusive
+
+                else:
+                    globs['regions'][line[0]] = None;
+                # Other lines are whole regions
+            ## End regions file loop
+
+            if not globs['regions']:
+                CORE.errorOut("OP19", "Did not read any regions from the file provided with -r.", globs);
+        # If a file is given as -r, read the regions or BED intervals from it
+
+        else:
+            globs['regions'] = { region.strip() : None for region in args.regions.split(",") if region.strip() };
+        # If regions are supplied directly in the command line as a comma separated list, split them here
+    # Parse the regions option
+
+    if globs['gxf-file'] and args.transcript_ids:
+        if os.path.isfile(args.transcript_ids):
+            globs['transcript-ids'] = set( line.strip() for line in open(args.transcript_ids) if line.strip() and line[0] != "#" );
+            if not globs['transcript-ids']:
+                CORE.errorOut("OP20", "Did not read any transcript or gene IDs from the file provided with -t.", globs);
+        # If a file is given as -t, read the IDs from it
+
+        else:
+            globs['transcript-ids'] = set( t_id.strip() for t_id in args.transcript_ids.split(",") if t_id.strip() );
+        # If IDs are supplied directly in the command line as a comma separated list, split them here
+    # Parse the transcript IDs option
+
+    if globs['gxf-file'] and args.longest_only_flag:
+        globs['longest-only'] = True;
+    # Parse the longest only option
+
     ####################
 
     globs = CORE.fileCheck(globs);
@@ -252,6 +351,25 @@ def optParse(globs):
         os.makedirs(globs['outdir']);
     # Main output dir
 
+    if len(globs['gxf-files']) > 1:
+        subdirs = [];
+        for gxf_entry in globs['gxf-files']:
+            subdir = CORE.removeCompressionExt(os.path.basename(gxf_entry[0]));
+            for ext in [".gff3", ".gff", ".gtf"]:
+                if subdir.endswith(ext):
+                    subdir = subdir[:-len(ext)];
+            # Name the subdirectory after the annotation file without its compression and annotation extensions
+
+            base_subdir, dup = subdir, 1;
+            while subdir in subdirs:
+                dup += 1;
+                subdir = base_subdir + "-" + str(dup);
+            subdirs.append(subdir);
+            # Make the names unique if two annotation files have the same name in different directories
+
+            gxf_entry[2] = os.path.join(globs['outdir'], subdir);
+    # Output subdirectories for each annotation when several are given
+
     globs['outbed'] = os.path.join(globs['outdir'], globs['outbed']);
     # Main bed file with degeneracy for all sites
 
@@ -261,6 +379,17 @@ def optParse(globs):
     globs['out-transcript'] = os.path.join(globs['outdir'], globs['out-transcript']);
     # Main bed file with degeneracy for all sites
 
+    globs['outmanifest'] = os.path.join(globs['outdir'], globs['outmanifest']);
+    # Run manifest, used to reuse the output of this run with --prev-run
+
+    if args.haplotypes_flag:
+        if not globs['vcf-file']:
+            CORE.errorOut("OP24", "--haplotypes requires a phased VCF file (-v).", globs);
+        globs['haplotypes'] = True;
+        globs['outhapseq'] = os.path.join(globs['outdir'], globs['outhapseq']);
+        globs['outhapcounts'] = os.path.join(globs['outdir'], globs['outhapcounts']);
+    # Haplotype CDS and site counts with --haplotypes
+
     if args.sfs:
         globs['sfs'] = args.sfs;
     # Check if the flag to output raw allele frequencies is set to True
@@ -312,6 +441,28 @@ def optParse(globs):
 
     ####################
 
+    if args.stream_flag:
+        globs['stream'] = True;
+    # Parse the --stream option
+
+    if args.genome_cache_flag:
+        if not globs['gxf-file']:
+            warnings.append("# WARNING: --genome-cache was specified without an annotation file (-a) and genome (-g). This option will be ignored.");
+        else:
+            globs['genome-cache'] = True;
+    # Parse the --genome-cache option
+
+    if args.annotation_cache_flag:
+        if not globs['gxf-file']:
+            warnings.append("# WARNING: --annotation-cache was specified without an annotation file (-a). This option will be ignored.");
+        elif globs['gxf-file'] == "-":
+            warnings.append("# WARNING: --annotation-cache can't be used with an annotation read from stdin (-a -). This option will be ignored.");
+        else:
+            globs['annotation-cache'] = True;
+    # Parse the --annotation-cache option
+
+    ####################
+
     if args.extract_seq:
         for char in args.extract_seq:
             if char not in ["0","2","3","4"]:
@@ -326,6 +477,41 @@ def optParse(globs):
 
     ####################
 
+    if args.stdout_output:
+        if len(globs['gxf-files']) > 1:
+            CORE.errorOut("OP18", "--stdout can't be used with more than one annotation file (-a).", globs);
+        if any((args.write_cds, args.write_cds_aa, args.write_longest, args.write_longest_aa)):
+            CORE.errorOut("OP18", "--stdout can't be used with -c, -ca, -l, or -la.", globs);
+        if args.stdout_output == "mk" and "ns" not in globs['codon-methods']:
+            CORE.errorOut("OP18", "--stdout mk requires a VCF file (-v) for the MK tests.", globs);
+        if args.stdout_output == "seq" and not globs['outseq']:
+            CORE.errorOut("OP18", "--stdout seq requires sites to extract with -x.", globs);
+
+        globs['stdout-output'] = args.stdout_output;
+        globs[{ 'bed' : 'outbed', 'transcript' : 'out-transcript', 'mk' : 'outmk', 'seq' : 'outseq' }[args.stdout_output]] = "-";
+    # Parse the --stdout option. The chosen output file is replaced with "-", which OUT.openOutput() opens as stdout
+
+    ####################
+
+    if args.prev_run:
+        if not os.path.isdir(args.prev_run):
+            CORE.errorOut("OP22", "Previous run directory (--prev-run) not found: " + args.prev_run, globs);
+        if os.path.abspath(args.prev_run) == os.path.abspath(globs['outdir']):
+            CORE.errorOut("OP22", "The previous run directory (--prev-run) must be different from the output directory (-o).", globs);
+        # The previous output is read while the new output is written, so they can't be in the same directory
+
+        if any((args.write_cds, args.write_cds_aa, args.write_longest, args.write_longest_aa)):
+            warnings.append("# WARNING: --prev-run has no effect with -c, -ca, -l, or -la. This option will be ignored.");
+        elif globs['haplotypes']:
+            warnings.append("# WARNING: --prev-run can't be used with --haplotypes since the haplotype output isn't recorded in the run manifest. This option will be ignored.");
+        elif globs['stdout-output']:
+            warnings.append("# WARNING: --prev-run can't be used with --stdout since the output positions of each transcript can't be found in a stream. This option will be ignored.");
+        else:
+            globs['prev-run'] = os.path.abspath(args.prev_run);
+    # Parse the --prev-run option
+
+    ####################
+
     globs['run-name'] = os.path.basename(os.path.normpath(globs['outdir']));
     globs['logfilename'] = os.path.join(globs['outdir'], globs['run-name'] + ".log");
     # Log file
@@ -391,12 +577,20 @@ def startProg(globs):
     CORE.printWrite(globs['logfilename'], globs['log-v'], "# " + "-" * 125);
     CORE.printWrite(globs['logfilename'], globs['log-v'], "# INPUT/OUTPUT INFO:");
 
-    if globs['gxf-file']:
+    if len(globs['gxf-files']) > 1:
+        for gxf_file, gxf_type, subdir in globs['gxf-files']:
+            CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Annotation file (" + gxf_type + "):", pad) + gxf_file + " -> " + subdir);
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Genome file:", pad) + globs['fa-file']);
+    # With several annotation files, list each with its output subdirectory. The output file names below are used in each subdirectory
+
+    elif globs['gxf-file']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Annotation file:", pad) + globs['gxf-file']);
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Annotation file type:", pad) + globs['gxf-type']);
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Genome file:", pad) + globs['fa-file']);
     elif globs['in-seq']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Sequence " + globs['in-seq-type'] + ":", pad) + globs['in-seq']);
+        if globs['cds-coords']:
+            CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# CDS coordinates file:", pad) + globs['cds-coords']);
 
     if globs['vcf-file']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# VCF file:", pad) + globs['vcf-file']);
@@ -404,10 +598,12 @@ def startProg(globs):
     CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Output directory:", pad) + globs['outdir']);
     if globs['write-cds']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# CDS dna output:", pad) + globs['write-cds']);
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# CDS coordinates output:", pad) + globs['write-cds'] + globs['cds-coords-ext']);
     if globs['write-cds-aa']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# CDS protein output:", pad) + globs['write-cds-aa']);
     if globs['write-longest']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Longest transcript dna output:", pad) + globs['write-longest']);
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Longest transcript coordinates output:", pad) + globs['write-longest'] + globs['cds-coords-ext']);
     if globs['write-longest-aa']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Longest transcript protein output:", pad) + globs['write-longest-aa']);
     else:
@@ -419,6 +615,16 @@ def startProg(globs):
 
         if "ns" in globs['codon-methods']:
             CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# MK test count output:", pad) + globs['outmk']);
+
+        if globs['haplotypes']:
+            CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Haplotype CDS output:", pad) + globs['outhapseq']);
+            CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Haplotype count output:", pad) + globs['outhapcounts']);
+
+        if not globs['stdout-output']:
+            CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Run manifest:", pad) + globs['outmanifest']);
+
+        if globs['prev-run']:
+            CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Previous run to reuse:", pad) + globs['prev-run']);
         
     CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Log file:", pad) + os.path.basename(globs['logfilename']));
     # Input/Output
@@ -428,9 +634,9 @@ def startProg(globs):
     CORE.printWrite(globs['logfilename'], globs['log-v'], "# OPTIONS INFO:");
     CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Option", pad) + CORE.spacedOut("Current setting", opt_pad) + "Current action");
 
-    # CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Processes (-p)", pad) +
-    #             CORE.spacedOut(str(globs['num-procs']), opt_pad) +
-    #             "degenotate will use this many processes.");
+    CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# Processes (-p)", pad) +
+                CORE.spacedOut(str(globs['num-procs']), opt_pad) +
+                "degenotate will use this many processes.");
     # Reporting the resource options
 
     CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# -m", pad) +
@@ -438,6 +644,26 @@ def startProg(globs):
                 "Transcripts shorter than this length will be ignored by degnotate.");
     # The min length (-m) options
 
+    if globs['regions']:
+        num_intervals = sum( len(intervals) for intervals in globs['regions'].values() if intervals is not None );
+        regions_str = str(len(globs['regions'])) + " regions" + (" (" + str(num_intervals) + " intervals)" if num_intervals else "");
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# -r", pad) +
+                    CORE.spacedOut(regions_str, opt_pad) +
+                    "Only transcripts in these regions will be processed.");
+    # Reporting the regions option
+
+    if globs['transcript-ids']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# -t", pad) +
+                    CORE.spacedOut(str(len(globs['transcript-ids'])) + " IDs", opt_pad) +
+                    "Only these transcripts, or the transcripts of these genes, will be processed.");
+    # Reporting the transcript IDs option
+
+    if globs['longest-only']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --longest-only", pad) +
+                    CORE.spacedOut("True", opt_pad) +
+                    "Only the longest transcript of each gene will be processed.");
+    # Reporting the longest only option
+
     if globs['write-cds'] or globs['write-longest']:
         if globs['write-cds']:
             CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# -c", pad) +
@@ -496,6 +722,36 @@ def startProg(globs):
                     "degenotate will split FASTA headers at this character.");
     # Reporting the delim option
 
+    if globs['stream']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --stream", pad) +
+                    CORE.spacedOut("True", opt_pad) +
+                    "CDS will be read and processed one genome region (-a/-g) or sequence (-s) at a time.");
+    # Reporting the stream option
+
+    if globs['haplotypes']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --haplotypes", pad) +
+                    CORE.spacedOut("True", opt_pad) +
+                    "The phased alleles of each sample in the VCF will be applied to the CDS.");
+    # Reporting the haplotypes option
+
+    if globs['stdout-output']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --stdout", pad) +
+                    CORE.spacedOut(globs['stdout-output'], opt_pad) +
+                    "This output will be written to stdout and all messages to stderr.");
+    # Reporting the stdout option
+
+    if globs['genome-cache']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --genome-cache", pad) +
+                    CORE.spacedOut("True", opt_pad) +
+                    "Exons will be read from a packed cache of the genome, which will be built if needed.");
+    # Reporting the genome cache option
+
+    if globs['annotation-cache']:
+        CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --annotation-cache", pad) +
+                    CORE.spacedOut("True", opt_pad) +
+                    "Transcripts will be loaded from a cache of the annotation, which will be built if needed.");
+    # Reporting the annotation cache option
+
     if globs['overwrite']:
         CORE.printWrite(globs['logfilename'], globs['log-v'], CORE.spacedOut("# --overwrite", pad) +
                     CORE.spacedOut("True", opt_pad) +
@@ -531,3 +787,35 @@ def startProg(globs):
     #######################
 
 #############################################################################
+
+def setAnnotation(globs, gxf_entry):
+# When several annotation files are given with -a, this sets up the run for the next one: the annotation
+# file and type, the output files in its subdirectory, and clears anything read for the previous annotation
+
+    globs['gxf-file'], globs['gxf-type'], subdir = gxf_entry;
+    # The current annotation file
+
+    if not os.path.isdir(subdir):
+        os.makedirs(subdir);
+    # Output subdirectory for this annotation
+
+    for out_key in ['outbed', 'out-transcript', 'outmk', 'outseq', 'outmanifest', 'outhapseq', 'outhapcounts', 'write-cds', 'write-cds-aa', 'write-longest', 'write-longest-aa']:
+        if globs[out_key]:
+            globs[out_key] = os.path.join(subdir, os.path.basename(globs[out_key]));
+    # Each output file keeps its name but is written to the subdirectory
+
+    globs['annotation'] = {};
+    globs['genekey'] = {};
+    globs['short-transcripts'] = [];
+    globs['cds-seqs'] = {};
+    globs['coords'] = {};
+    # Clear the annotation and coding sequences from the previous annotation file
+
+    step = "Starting annotation " + os.path.basename(subdir);
+    step_start_time = CORE.report_step(globs, step, False, "In progress...");
+    step_start_time = CORE.report_step(globs, step, step_start_time, "Output: " + os.path.basename(subdir) + "/");
+    # Mark the start of this annotation in the log
+
+    return globs;
+
+#############################################################################
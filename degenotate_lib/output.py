@@ -4,7 +4,17 @@
 
 import sys
 import os
-import textwrap
+
+#############################################################################
+
+def openOutput(filename):
+# Opens an output file for writing, or stdout if the filename is "-" (with --stdout)
+
+    if filename == "-":
+        return open(sys.__stdout__.fileno(), "w", closefd=False);
+    else:
+        return open(filename, "w");
+    # sys.stdout is redirected to stderr with --stdout, so the original stdout is used for the output
 
 #############################################################################
 
@@ -14,10 +24,10 @@ def compileBedLine(globs, transcript, transcript_region, cds_coord, base, codon,
     outline = [];
     # Initialize an empty list to add output to
 
-    if globs['gxf-file']:
-        genome_coord = globs['coords'][transcript][cds_coord];
+    if globs['gxf-file'] or globs['cds-coords']:
+        genome_coord = globs['coords'][transcript].toGenome(cds_coord);
         outline += [transcript_region, genome_coord-1, genome_coord];
-    # In case the input was a gxf file and a genome, the first three columns of output
+    # In case the input was a gxf file and a genome (or CDS with --cds-coords), the first three columns of output
     # reference genome coordinate which are retrieved here
 
     else:
@@ -25,7 +35,13 @@ def compileBedLine(globs, transcript, transcript_region, cds_coord, base, codon,
     # If the input was a directory of CDS sequences, the first three columns of output
     # reference the CDS coordinates
 
-    outline += [transcript + ":" + str(cds_coord), base_degen, base, aa];
+    cds_pos = cds_coord;
+    if globs['cds-coords']:
+        cds_pos += globs['annotation'][transcript].start_frame;
+    # CDS written with -c or -l start after the leading bases out of frame, so with --cds-coords the position is
+    # offset by the start frame of the CDS to give the same position in the transcript as from the annotation
+
+    outline += [transcript + ":" + str(cds_pos), base_degen, base, aa];
     # The rest of the output except for the substitution strings
 
     subs = [];
@@ -94,10 +110,10 @@ def writeTranscriptSummary(globs, transcript, sum_dict, summary_stream):
 # Writes the summary output for a transcript including counts of sites per fold
 
     if globs['gxf-file']:
-        geneid = globs['annotation'][transcript]['gene-id']
-        cdslen = str(globs['annotation'][transcript]['cdslen'])
-        mrnalen = str(globs['annotation'][transcript]['len'])
-        longest = str(globs['annotation'][transcript]['longest']) 
+        geneid = globs['annotation'][transcript].gene_id
+        cdslen = str(globs['annotation'][transcript].cdslen)
+        mrnalen = str(globs['annotation'][transcript].len)
+        longest = str(globs['annotation'][transcript].longest) 
     else:
         geneid = transcript
         cdslen = str(len(globs['cds-seqs'][transcript]))
@@ -111,19 +127,53 @@ def writeTranscriptSummary(globs, transcript, sum_dict, summary_stream):
 
 #############################################################################
 
+def initializeHaplotypeSummary(summary_stream):
+# Writes the headers for the haplotype site count file with --haplotypes
+
+    cols = ["transcript", "sample", "haplotype", "num_variants", "f0", "f2", "f3", "f4"];
+    summary_stream.write("\t".join(cols) + "\n");
+
+#############################################################################
+
+def writeHaplotypeSummary(transcript, sample, hap_num, num_variants, sum_dict, summary_stream):
+# Writes the counts of sites per fold for one haplotype of a transcript
+
+    outline = [ transcript, sample, str(hap_num), str(num_variants) ];
+    outline += [ str(sum_dict[fold]) for fold in sum_dict ];
+    summary_stream.write("\t".join(outline) + "\n");
+
+#############################################################################
+
 def writeSeq(header, seq, seq_stream, linelen=60):
-# A function to write sequences in FASTA format when -x is specified
+# A function to write sequences in FASTA format when -x, -c, -ca, -l, or -la is specified
+
+    seq_stream.write(header + "\n" + "\n".join([ seq[i:i+linelen] for i in range(0, len(seq), linelen) ]) + "\n");
+    # Wrap the sequence by slicing it into lines, which is much faster than textwrap for long sequences without spaces
+
+
+#############################################################################
+
+def initializeCDSCoords(coords_stream):
+# Writes the headers for the file of CDS genome coordinates written with -c and -l
+
+    coords_stream.write("#transcript\tregion\tstrand\tstart_frame\tblocks\n");
+
+#############################################################################
 
-    seq_stream.write(header + "\n");
-    seq_stream.write(textwrap.fill(seq, linelen) + "\n");
+def compileCDSCoordsLine(transcript, region, coord_map, extra_leading_nt, extra_trailing_nt):
+# Compiles the line for a transcript in the file of CDS genome coordinates: its genome region, strand, the frame
+# of the CDS in the annotation, and the 1-based start and end of each block in CDS order. The blocks only cover the
+# bases in the written sequence, after the leading and trailing bases out of frame are removed
 
+    blocks = ",".join([ str(start) + "-" + str(end) for start, end in coord_map.blocks(extra_leading_nt, extra_trailing_nt) ]);
+    return "\t".join([ transcript, region, coord_map.strand, str(extra_leading_nt), blocks ]) + "\n";
 
 #############################################################################
 
 def initializeMKFile(globs, mkfilename):
 # Opens the MK output file and writes the headers
 
-    mkfile = open(mkfilename, "w");
+    mkfile = openOutput(mkfilename);
     cols = ['transcript', 'pN', 'pS', 'dN', 'dS',  'pval', 'odds_ni', 'dos'];
 
     if globs['vcf-polarized']:
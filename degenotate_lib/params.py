@@ -46,12 +46,16 @@ def init():
         'gxf-file' : False,
         'fa-file' : False,
         'gxf-type' : False,
-        # Input with annotation file and genome file
+        'gxf-files' : [],
+        # Input with annotation file and genome file. With more than one annotation file, gxf-files holds
+        # [<annotation file>, <type>, <output subdirectory>] for each and gxf-file is the current one
 
         'in-seq' : False,
         'in-seq-type' : False,
         'seq-delim' : False,
-        # Input by a directory with many fasta files or a single multi-fasta
+        'cds-coords' : False,
+        # Input by a directory with many fasta files or a single multi-fasta, and optionally the genome coordinates of
+        # each CDS as written with -c or -l
 
         'vcf-file' : False,
         'vcf-index-file' : False,
@@ -62,7 +66,9 @@ def init():
         'vcf-outgroups' : False,
         'vcf-exclude' : [],
         'vcf-polarized' : False,
-        # Input VCF file
+        'haplotypes' : False,
+        'haplotype-samples' : [],
+        # Input VCF file. With --haplotypes, the phased alleles of the haplotype samples are applied to each CDS
 
         'gxf-compression' : 'none',
         'seq-compression' : 'none',
@@ -74,15 +80,24 @@ def init():
         'out-transcript' : 'transcript-counts.tsv',
         'outmk'  : 'mk.tsv',
         'outseq' : False,
+        'outmanifest' : 'run-manifest.tsv',
+        'outhapseq' : 'haplotype-cds.fa',
+        'outhapcounts' : 'haplotype-counts.tsv',
         'write-cds' : False,
         'write-cds-aa' : False,
         'write-longest' : False,
         'write-longest-aa' : False,
+        'cds-coords-ext' : '.coords.tsv',
         'run-name' : 'degenotate',
         'logfilename' : 'degenotate.errlog',
         'logdir' : '',
         'overwrite' : False,
-        # I/O options
+        'stream' : False,
+        'genome-cache' : False,
+        'annotation-cache' : False,
+        'stdout-output' : False,
+        'prev-run' : False,
+        # I/O options. cds-coords-ext is added to the -c and -l file names for the file of CDS genome coordinates
 
         'sfs' : False,
         # Output raw allele frequencies for syn/nonsyn polymorphisms if True
@@ -97,10 +112,12 @@ def init():
         # Site types to extract with -x
 
         'genome-seqs' : {},
+        'genome-index' : {},
+        'genome-stream' : False,
         'cds-seqs' : {},
         'coords' : {},
-        'coords-rev' : {},
-        # Sequence variables
+        # Sequence variables. coords holds a table of the coding exons of each transcript (coords.CoordMap)
+        # to convert between CDS and genome coordinates
 
         'degeneracy' : {},
         # Degeneracy output
@@ -112,7 +129,10 @@ def init():
         'genekey' : {},
         'min-len' : 3,
         'short-transcripts' : [],
-        # Annotation information
+        'regions' : False,
+        'transcript-ids' : False,
+        'longest-only' : False,
+        # Annotation information and filters
 
         'count-fixed-alt-ingroups' : True,
         # For MK tests, whether or not to count sites where all ingroup samples share an allele that differs
@@ -129,7 +149,8 @@ def init():
         # for calculating the fraction of weakly deleterious polymorphisms for imputed MKT calculation
 
         'num-procs' : 1,
-        # Number of processes to use; currently multiprocessing not implemented
+        # Number of processes to use; currently only used to read directories of CDS files, to decompress inputs, to parse large annotation files,
+        # and to extract CDS
 
         'codon-methods' : ["degen"],
         # which codon processing steps to carry out
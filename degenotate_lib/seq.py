@@ -4,79 +4,204 @@
 
 import sys
 import os
-import gzip
+import itertools
+import multiprocessing as mp
 import degenotate_lib.core as CORE
+import degenotate_lib.genome as GENOME
+import degenotate_lib.coords as COORDS
+import degenotate_lib.gxf as GXF
+import degenotate_lib.decompress as DECOMP
 import degenotate_lib.output as OUT
-from itertools import groupby
 
 #############################################################################
 
-def bioTranslator(seq, code):
-# A function to translate a codon sequence to amino acids
+EXTRACT_MIN_TRANSCRIPTS = 10000;
+# The number of transcripts needed to extract CDS with multiple processes with -p. For fewer, starting the
+# processes takes longer than the extraction
+#############################################################################
+
+class Translator:
+# Translates coding sequences through a lookup table with one amino acid for each codon. Each base is converted to
+# an index (0-3 for A, C, G, T, and 4 for anything else) in one pass over the sequence, so the codon index is
+# 25 * first + 5 * second + third. Codons with ambiguous bases (e.g. N) are translated as X. The codons are looked up
+# all at once with NumPy if it is installed, or one at a time in a list comprehension otherwise
+
+    __slots__ = ("table", "np");
+
+    BASE_INDEX = bytes([ "ACGT".index(chr(c).upper()) if chr(c).upper() in "ACGT" else 4 for c in range(256) ]);
+    # A bytes.translate() table from each base character to its index
+
+    def __init__(self, code):
+        table = bytearray(b"X" * 125);
+        for codon, aa in code.items():
+            bases = codon.encode().translate(self.BASE_INDEX);
+            table[bases[0] * 25 + bases[1] * 5 + bases[2]] = ord(aa);
+        # Put the amino acid of each codon in the provided code dict at the index of the codon
 
-    assert len(seq) % 3 == 0, "\nOUT OF FRAME NUCLEOTIDE SEQUENCE! " + str(len(seq));
-    # Check that sequence is in frame.
+        try:
+            import numpy as np
+            self.np = np;
+            self.table = np.frombuffer(bytes(table), dtype=np.uint8);
+        except ImportError:
+            self.np = None;
+            self.table = bytes(table);
+        # NumPy is optional and only used to speed up the lookup
 
-    codon_seq = [(seq[i:i+3]) for i in range(0, len(seq), 3)];
-    # Get chunks of 3 characters into a list.
+    def translate(self, seq):
+    # Translates a sequence that is in frame and a multiple of 3 long
+
+        assert len(seq) % 3 == 0, "\nOUT OF FRAME NUCLEOTIDE SEQUENCE! " + str(len(seq));
+        # Check that sequence is in frame.
+
+        bases = seq.encode().translate(self.BASE_INDEX);
+        # Convert the bases to indices
+
+        if self.np:
+            bases = self.np.frombuffer(bases, dtype=self.np.uint8).reshape(-1, 3);
+            return self.table[bases[:, 0] * 25 + bases[:, 1] * 5 + bases[:, 2]].tobytes().decode();
+        # With NumPy, compute all codon indices and look them up at once. The largest index is 124, so it fits in uint8
+
+        table = self.table;
+        base_iter = iter(bases);
+        return bytes([ table[first * 25 + second * 5 + third] for first, second, third in zip(base_iter, base_iter, base_iter) ]).decode();
+        # Otherwise, step through the indices three at a time
+
+#############################################################################
 
-    aa_seq = [ code[codon] for codon in codon_seq];
-    # Build the aa sequence by looking up each codon in the provided code dict
+def bioTranslator(seq, code):
+# A function to translate a codon sequence to amino acids with a provided code dict. To translate many sequences,
+# make a Translator once and use its translate() method instead
 
-    return "".join(aa_seq);
-    # Return the amino acid sequence as a string
+    return Translator(code).translate(seq);
 
 ############################################################################# 
 
-def readFasta(filename, seq_compression, seq_delim):
-# Read a FASTA formatted sequence file
-# Great iterator and groupby code from: https://www.biostars.org/p/710/ 
-
-    if seq_compression == "gz":
-        file_stream = gzip.open(filename);
-        fa_iter = (x[1] for x in groupby(file_stream, lambda line: line.decode()[0] == ">"));
-        readstr = lambda s : s.decode().strip();
-    elif seq_compression == "none":
-        file_stream = open(filename); 
-        fa_iter = (x[1] for x in groupby(file_stream, lambda line: line[0] == ">"));
-        readstr = lambda s : s.strip();
-    # Read the lines of the file depending on the compression level
-    # file_stream opens the file as an iterable
-    # groupby takes an iterable (file_stream) and a function that indicates the key of the group. It iterates over
-    # the iterable and when it encounters a key, it groups all following items to it (perfect for FASTA files).
-    # fa_iter is a generator object holding all the grouped iterators.
-    # readstr is a function that changes depending on compression level -- for compressed files we also need to decode
-    # each string in the iterators below.
+def findRecordStart(data, start=0):
+# Finds the next line break followed by ">" in data at or after start, like data.find(b"\n>", start), or -1 if there
+# isn't one. Searching for the rare ">" and checking the character before it is much faster than searching for
+# "\n>", which has to stop at every line break
 
-    seqdict = {};
-    # A dictionary of sequences:
-    # <sequence id/header> : <sequence>
+    pos = data.find(b">", start + 1);
+    while pos != -1 and data[pos-1] != 10:
+        pos = data.find(b">", pos + 1);
+    # 10 is the byte value of a line break
+
+    return pos - 1 if pos != -1 else -1;
 
-    for header_obj in fa_iter:
-        header = readstr(header_obj.__next__());
-        # The header object is an iterator. This gets the string.
+#############################################################################
+
+def iterFasta(filename, seq_compression, seq_delim, threads=1, chunk_size=2**24, as_bytes=False, first_word=False):
+# Read a FASTA formatted sequence file one sequence at a time, yielding (header, sequence) tuples
+# The file is read as bytes in large chunks, and each chunk is split into records wherever a new line
+# starts with ">". Line breaks are then removed from each whole sequence at once, rather than decoding
+# and stripping every line individually.
+# With as_bytes, sequences are left as bytes (used for genomes, which extractCDS() works on as bytes)
+# With first_word, sequences are named by the first word of the header, as in a .fai index (used for genomes)
+
+    file_stream = DECOMP.openFile(filename, seq_compression, threads);
+    if seq_compression == "none" and filename != "-":
+        chunk_size = min(chunk_size, os.path.getsize(filename) + 1);
+    # Open the file as bytes, decompressing it on a background thread if it is compressed
+    # For uncompressed files, don't read chunks larger than the file
+
+    whitespace = b" \t\r\n\x0b\x0c";
+    # Characters to remove from sequences. Line feeds are removed first with bytes.replace(), which is about twice as
+    # fast as deleting all of these with bytes.translate(), and the others are only removed if any are left
+
+    def parseRecord(data, start, end):
+    # Splits a record (the text following a ">" between start and end) into the header and the sequence
+        header_end = data.find(b"\n", start, end);
+        if header_end == -1:
+            header_end = end;
+
+        header = data[start:header_end].decode().rstrip();
+        if first_word:
+            header = (header.split() or [""])[0];
+        # Genome sequences are named by the first word of the header, as in a .fai index or the genome cache
 
-        curkey = header[1:];
         if seq_delim:
-            curkey = curkey.split(seq_delim)[0];         
-        # This removes the ">" character from the header string to act as the key in seqdict
-        # and splits the header based on user input from the -d option
+            header = header.split(seq_delim)[0];
+        # Splits the header based on user input from the -d option
+
+        seq = data[header_end+1:end].replace(b"\n", b"");
+        if b"\r" in seq or b" " in seq or b"\t" in seq or b"\x0b" in seq or b"\x0c" in seq:
+            seq = seq.translate(None, whitespace);
+        if as_bytes:
+            return header, seq;
+        return header, seq.decode();
+        # Remove all line breaks from the sequence at once
+
+    record_chunks = [];
+    in_record = False;
+    last_char = b"\n";
+    # The chunks of the file making up the current (incomplete) record, whether a record has been started,
+    # and the last character of the previous chunk
+
+    for chunk in iter(lambda : file_stream.read(chunk_size), b""):
+        if findRecordStart(chunk) == -1 and not (last_char == b"\n" and chunk[:1] == b">"):
+            record_chunks.append(chunk);
+            last_char = chunk[-1:];
+            continue;
+        # If there is no new record in this chunk, it is all part of the current record. Saving these in a list
+        # means long sequences (e.g. chromosomes) are only joined once when the whole record has been read
 
-        seq = "".join(readstr(s) for s in fa_iter.__next__());
-        # The current header should correspond to the current iterator in fa_iter. This gets all those
-        # lines and combines them as a string.
+        last_char = chunk[-1:];
+        if record_chunks:
+            data = b"".join(record_chunks + [chunk]);
+        else:
+            data = chunk;
+        search_start = max(len(data) - len(chunk) - 1, 0);
+        # Add the chunk to the current record. The earlier chunks of the record have already been checked for new
+        # records, so only search from the line break that may end the previous chunk
+
+        pos = 0;
+        if not in_record and data[:1] == b">":
+            in_record = True;
+            pos = 1;
+        # A ">" at the very start of the file starts the first record
+
+        record_end = findRecordStart(data, max(pos, search_start));
+        while record_end != -1:
+            if in_record:
+                yield parseRecord(data, pos, record_end);
+            # Return the completed record. If no record has been started, this is anything in the file before the
+            # first header, which is skipped
+
+            in_record = True;
+            pos = record_end + 2;
+            record_end = findRecordStart(data, pos);
+        # Find every new line starting with ">" in the chunk
+
+        record_chunks = [memoryview(data)[pos:]];
+        # The last record may continue into the next chunk
+    ## End chunk loop
+
+    if in_record:
+        data = b"".join(record_chunks);
+        yield parseRecord(data, 0, len(data));
+    # Return the last record
+
+    file_stream.close();
+
+#############################################################################
 
-        #print(header, len(seq));
+def readFasta(filename, seq_compression, seq_delim, threads=1, keep_headers=None, as_bytes=False, first_word=False):
+# Read a FASTA formatted sequence file into a dictionary of sequences:
+# <sequence id/header> : <sequence>
+# If keep_headers is given, only the sequences with those headers are kept
 
-        seqdict[curkey] = seq;
+    seqdict = {};
+    for curkey, seq in iterFasta(filename, seq_compression, seq_delim, threads, as_bytes=as_bytes, first_word=first_word):
+        if keep_headers is None or curkey in keep_headers:
+            seqdict[curkey] = seq;
         # Save the sequence in the dictionary
 
     return seqdict;
 
 #############################################################################
 
-def readGenome(globs):
-# A function that reads an entire genome fasta file into memory
+def detectGenomeCompression(globs):
+# Detects the compression of the genome fasta file
 
     step = "Detecting compression of genome FASTA file";
     step_start_time = CORE.report_step(globs, step, False, "In progress...");
@@ -87,146 +212,286 @@ def readGenome(globs):
         step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + globs['seq-compression'] + " detected");
     # Detect the compression of the input sequence file
 
+    return globs;
+
+#############################################################################
+
+def readGenome(globs):
+# A function that opens the packed genome cache (with --genome-cache) or indexes the genome fasta file, or reads
+# the entire genome into memory if it can't be indexed
+
+    if globs['genome-cache']:
+        seq_iter = iterFasta(globs['fa-file'], globs['seq-compression'], False, globs['num-procs'], first_word=True);
+        if GENOME.cacheGenome(globs, seq_iter):
+            return globs;
+        else:
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: the genome cache could not be written next to the genome FASTA file. The genome will be read without it.");
+            globs['warnings'] += 1;
+            globs['genome-cache'] = False;
+    # With --genome-cache, use (or build) the packed genome cache. Sequence names in the cache are the first word
+    # of each header, as in a .fai index
+
+    if globs['seq-compression'] in ["none", "bgzf"]:
+        step = "Indexing genome FASTA file";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+        if GENOME.indexGenome(globs):
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(globs['genome-index'])) + " seqs indexed");
+            return globs;
+        else:
+            step_start_time = CORE.report_step(globs, step, step_start_time, "Failed: inconsistent line lengths");
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: the genome FASTA file has inconsistent line lengths and cannot be indexed. The whole genome will be read into memory.");
+            globs['warnings'] += 1;
+    # For uncompressed and BGZF compressed genomes, read or build a .fai index so exons can be read directly from the
+    # file without reading the whole genome into memory
+
+    if globs['stream']:
+        return globs;
+    # With --stream, a genome that can't be indexed will be read one sequence at a time by streamCDS()
+
     step = "Reading genome FASTA file";
     step_start_time = CORE.report_step(globs, step, False, "In progress...");
-    globs['genome-seqs'] = readFasta(globs['fa-file'], globs['seq-compression'], globs['seq-delim']);
+    if len(globs['gxf-files']) > 1:
+        annotation_headers = None;
+    else:
+        annotation_headers = set( globs['annotation'][t].header for t in globs['annotation'] );
+    globs['genome-seqs'] = readFasta(globs['fa-file'], globs['seq-compression'], globs['seq-delim'], globs['num-procs'], annotation_headers, as_bytes=True, first_word=True);
     step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(globs['genome-seqs'])) + " seqs read");
-    # Read the input sequence file
+    # Read the input sequence file, keeping only the sequences that have transcripts in the annotation
+    # When several annotation files are given, all sequences are kept since they are used for each annotation
+
+    checkRegions(globs, globs['genome-seqs']);
+    # The headers were checked by checkHeaders() before the genome was read, but check again in case the genome
+    # couldn't be indexed after all
 
     #print(list(globs['genome-seqs'].keys()))
-    ## NOTE: reading by index actually doesn't seem feasible because gzipped files must be decompressed each time seek() is called
+    ## NOTE: reading by index isn't feasible for plain gzipped files because they must be decompressed from the start each time
+    ## seek() is called. BGZF compressed files are indexed above.
 
     return globs;
 
 #############################################################################
 
-def checkHeaders(globs):
-    step = "Checking headers";
-    step_start_time = CORE.report_step(globs, step, False, "In progress...");
-    # Status update
+def checkRegions(globs, genome_headers):
+# Checks that every region in the annotation file is in the genome and errors out if one isn't
 
-    annotation_headers = set([ globs['annotation'][t]['header'] for t in globs['annotation'] ]);
+    annotation_headers = set([ globs['annotation'][t].header for t in globs['annotation'] ]);
     # Extract unique headers from annotation file
 
     for header in annotation_headers:
-        if header not in globs['genome-seqs']:
+        if header not in genome_headers:
             print();
             CORE.errorOut("SEQ1", "Region in annotation file not found in genome file: " + header + ". Reminder: you can use -d to trim FASTA headers at a given character.", globs);
     # Check each header in the annotation file against those in the FASTA file and print an error if one isn't found
 
+#############################################################################
+
+def checkHeaders(globs):
+# Checks the headers in the genome file against the regions in the annotation file and the contigs in the VCF file
+# before any sequence is read, so mismatched names are found right away. Returns the genome headers
+
+    step = "Checking headers";
+    step_start_time = CORE.report_step(globs, step, False, "In progress...");
+    # Status update
+
+    genome_headers = set(GENOME.scanHeaders(globs));
+    # Only the headers are read from the genome, from the genome cache or .fai index if possible
+
+    checkRegions(globs, genome_headers);
+    # Check the annotation regions
+
+    if globs['vcf-file']:
+        try:
+            from pysam import VariantFile
+        except:
+            print();
+            CORE.errorOut("VCF1", "Missing pysam dependency. Please install and try again: https://anaconda.org/bioconda/pysam", globs);
+
+        vcf_contigs = list(VariantFile(globs['vcf-file']).header.contigs);
+        # Only the header of the VCF file is read here
+
+        missing_contigs = [ contig for contig in vcf_contigs if contig not in genome_headers ];
+    # Get the contigs in the VCF file that aren't in the genome
+
     step_start_time = CORE.report_step(globs, step, step_start_time, "Success");
     # Status update
 
+    if globs['vcf-file']:
+        for contig in missing_contigs:
+            CORE.printWrite(globs['logfilename'], 3, "# WARNING: " + contig + " is present in the VCF file but not the genome fasta file.");
+            globs['warnings'] += 1;
+    # Add warnings for each contig in the VCF file that isn't in the input fasta file
+
+    return genome_headers;
+
+#############################################################################
+
+def seqTables(complement):
+# Tables to uppercase the sequence of a CDS, or complement and uppercase it, in one pass over the bytes
+
+    upper_table = bytes(range(256)).upper();
+    complement = "".join(complement).encode(), "".join(complement.values()).encode();
+    revcomp_table = upper_table.translate(bytes.maketrans(*complement)).upper();
+
+    return upper_table, revcomp_table;
+
 #############################################################################
 
-def extractCDS(globs):
+def assembleCDS(globs, exons, tables):
+# Assembles the CDS of one transcript from its exons in the genome, accounting for strand. Returns the sequence, the
+# coordinate table, and the coding start and frame of the transcript, or a string with the reason the transcript
+# was skipped ("no-exons" or "strands")
+
+    if exons.numExons() == 0:
+        return "no-exons";
+    # No exons means this transcript does not have a CDS, so we skip it
+
+    exon_seqs = [];
+    # Initialize the list of exon sequences for the current transcript. These will be joined and added to the 'seqs' dict later
+
+    header = exons.header;
+    strand = exons.strand;
+    # Unpack some info about the transcript
+
+    coord_map = COORDS.CoordMap(strand);
+    cds_coord = 0;
+    # Initialize the coordinate table for this transcript and start the coord count at 0
+
+    if exons.exon_strands != strand * exons.numExons():
+        return "strands";
+    # Add check to make sure exons all have same strand as transcript
+
+    exon_coords = dict(zip(exons.exon_starts, exons.exon_ends));
+    exon_phase = dict(zip(exons.exon_starts, exons.exon_phases));
+    # Get the coordinates of all the exons in this transcript
+
+    if strand == "+":
+        sorted_starts = sorted(list(exon_coords.keys()));
+    elif strand == "-":
+        sorted_starts = sorted(list(exon_coords.keys()), reverse=True);
+    # Sort the start coordinates based on strand
+     
+    first_exon_genome_start = sorted_starts[0];
+    first_exon_genome_end = exon_coords[sorted_starts[0]];
+    
+    if strand == "+":
+        coding_start = first_exon_genome_start
+    elif strand == "-":
+        coding_start = first_exon_genome_end
+    
+    start_frame = None;
+    if exon_phase[first_exon_genome_start] >= 0:
+        start_frame = exon_phase[first_exon_genome_start];
+    # Get the start and end coordinates of the first exon and the phase. If the phase of the first exon isn't known,
+    # the frame is left as None and the transcript is skipped with a warning
+
+    for genome_coord_start in sorted_starts:
+        cur_exon_seq = GENOME.getSeq(globs, header, genome_coord_start-1, exon_coords[genome_coord_start]);
+        # For each exon starting coordinate, extract the sequence that corresponds to the current header and
+        # start and end coordinates
+        # Subtract 1 here since GXF coordinates are 1-based and Python strings (like our genome) are 0-based
+
+        cur_exon_len = len(cur_exon_seq);
+        # Get the length of the current exon to count up coordinates
+
+        exon_seqs.append(cur_exon_seq);
+        # Add the current exon sequence (as bytes) to the list for the transcript
+
+        coord_map.addBlock(cds_coord, genome_coord_start, cur_exon_len);
+        # Add the current CDS to the coordinate table for this transcript. On the - strand, CoordMap reverses
+        # the coordinates within the block
+
+        cds_coord += cur_exon_len;
+        # Increment the CDS coordinate by the length of the current CDS so the next CDS has the correct starting coord
+
+    # End CDS loop
+    ##########
+
+    upper_table, revcomp_table = tables;
+    if strand == "-":
+        cur_seq = b"".join(reversed(exon_seqs)).translate(revcomp_table)[::-1];
+    else:
+        cur_seq = b"".join(exon_seqs).translate(upper_table);
+    # Join the exons once for the transcript. On the "-" strand, the exons are in descending order, so put them back
+    # in genome order and reverse complement the whole CDS at once
+
+    coord_map.finish();
+
+    return cur_seq.decode(), coord_map, coding_start, start_frame;
+
+#############################################################################
+
+def initExtractWorker(genome_source, complement):
+# Sets up a worker process for parallel CDS extraction: opens the genome as described by GENOME.shareGenome()
+# and builds the sequence tables once for the worker
+
+    global worker_genome, worker_tables;
+    worker_genome = GENOME.openSharedGenome(genome_source);
+    worker_tables = seqTables(complement);
+
+#############################################################################
+
+def extractGroup(group):
+# The worker function for parallel CDS extraction. Assembles the CDS of a group of transcripts from one
+# genome region, given as (<transcript id>, <Transcript>) tuples
+
+    return [ (transcript, assembleCDS(worker_genome, exons, worker_tables)) for transcript, exons in group ];
+
+#############################################################################
+
+def extractCDS(globs, transcripts=False):
 # This takes the coordiantes read from the input annotation file as well as the sequence read from the
 # input genome fasta file and extracts coding sequences and coordinates for the CDS of all transcripts
 # while accounting for strand
+# If a list of transcripts is given (for --stream), only those are extracted and the status updates are left to streamCDS()
 
-    step = "Extracting CDS";
-    step_start_time = CORE.report_step(globs, step, False, "In progress...");
+    if not transcripts:
+        transcripts = list(globs['annotation']);
+        step = "Extracting CDS";
+        step_start_time = CORE.report_step(globs, step, False, "In progress...");
+        report = True;
+    else:
+        report = False;
     # Status update
 
     transcripts_no_exons, rm_transcripts = [], [];
 
-    for transcript in globs['annotation']:
+    if report and globs['num-procs'] > 1 and len(transcripts) >= EXTRACT_MIN_TRANSCRIPTS:
+        groups, group_size = {}, -(-len(transcripts) // (globs['num-procs'] * 4));
+        for transcript in transcripts:
+            header = globs['annotation'][transcript].header;
+            if header not in groups or len(groups[header][-1]) == group_size:
+                groups.setdefault(header, []).append([]);
+            groups[header][-1].append((transcript, globs['annotation'][transcript]));
+        groups = [ group for header in groups for group in groups[header] ];
+        # Group the transcripts by genome region, splitting large regions so the work is spread across the processes
+
+        genome_source, shared_blocks = GENOME.shareGenome(globs);
+        with mp.Pool(processes=min(globs['num-procs'], len(groups)), initializer=initExtractWorker, initargs=(genome_source, globs['complement'])) as pool:
+            group_results = dict(itertools.chain.from_iterable(pool.imap_unordered(extractGroup, groups)));
+        for shared_block in shared_blocks:
+            shared_block.close();
+            shared_block.unlink();
+        # Assemble each group of transcripts in a worker process. The workers open the genome themselves (by memory map,
+        # the genome cache, or shared memory) rather than being sent a copy
+
+        results = ( (transcript, group_results[transcript]) for transcript in transcripts );
+        # Store the results in the order of the transcripts in the annotation, regardless of the order the groups finished in
+    else:
+        tables = seqTables(globs['complement']);
+        results = ( (transcript, assembleCDS(globs, globs['annotation'][transcript], tables)) for transcript in transcripts );
+    # With -p, extract the CDS with a pool of worker processes. Otherwise, extract each transcript in turn
 
-        if len(globs['annotation'][transcript]['exons']) == 0:
+    for transcript, result in results:
+        if result == "no-exons":
             transcripts_no_exons.append(transcript);
-            continue;
-        # No exons means this transcript does not have a CDS, so we skip it
-
-        cur_seq = "";
-        # Initialize the sequence string for the current transcript. This will be added to the 'seqs' dict later
-
-        globs['coords'][transcript] = {};
-        globs['coords-rev'][transcript] = {};
-        cds_coord = 0;
-        # Initialize the coord lookup dict for this transcript and start the coord count at 0
-
-        header = globs['annotation'][transcript]['header'];
-        strand = globs['annotation'][transcript]['strand'];
-        # Unpack some info about the transcript
-
-        exons = globs['annotation'][transcript]['exons'];
-        # Get the exons for the current transcript
-
-        if not all(exons[exon]['strand'] == strand for exon in exons):
-            # print("\n\n");
-            # print(transcript, strand);
-            # print(exons);
-            # print("\n\n");
-            # CORE.errorOut("SEQ2", "Some exons have differing strands", globs);
+        elif result == "strands":
             rm_transcripts.append(transcript);
-            continue;
-        # Add check to make sure exons all have same strand as transcript
-
-        exon_coords = { exons[exon]['start'] : exons[exon]['end'] for exon in exons };
-        exon_phase = { exons[exon]['start'] : exons[exon]['phase'] for exon in exons };
-        # Get the coordinates of all the exons in this transcript
-
-        if strand == "+":
-            sorted_starts = sorted(list(exon_coords.keys()));
-        elif strand == "-":
-            sorted_starts = sorted(list(exon_coords.keys()), reverse=True);
-        # Sort the start coordinates based on strand
-         
-        first_exon_genome_start = sorted_starts[0];
-        first_exon_genome_end = exon_coords[sorted_starts[0]];
-        
-        if strand == "+":
-            globs['annotation'][transcript]['coding-start'] = first_exon_genome_start
-        elif strand == "-":
-            globs['annotation'][transcript]['coding-start'] = first_exon_genome_end
-        
-        globs['annotation'][transcript]['start-frame'] = int(exon_phase[first_exon_genome_start])
-        # Get the start and end coordinates of the first exon and the phase
-
-        for genome_coord_start in sorted_starts:
-            cur_exon_seq = globs['genome-seqs'][header][genome_coord_start-1:exon_coords[genome_coord_start]];
-            # For each exon starting coordinate, extract the sequence that corresponds to the current header and
-            # start and end coordinates
-            # Subtract 1 here since GXF coordinates are 1-based and Python strings (like our genome) are 0-based
-
-            cur_exon_len = len(cur_exon_seq);
-            # Get the length of the current exon to count up coordinates
-
-            cds_coord_list = list(range(cds_coord, cds_coord+cur_exon_len));
-            # The list of coordinates in the current CDS relative to the first CDS
-
-            genome_coord_list = list(range(genome_coord_start, genome_coord_start+cur_exon_len));
-            # The list of genome coordinates in the current CDS
-
-            if strand == "-": 
-                cur_exon_seq = "".join(globs['complement'].get(base, base) for base in reversed(cur_exon_seq));
-                # Reverse complement the sequence of the current CDS
-                
-                genome_coord_list.reverse(); 
-                # Reverse the order of the genome coordinates             
-            # If the strand is "-", get the reverse complement of the sequence and reverse the coordinates
-
-            cur_seq += cur_exon_seq;
-            # Concatenate the current exon sequence onto the overall transcript sequence
-
-            for i in range(len(cds_coord_list)):
-                globs['coords'][transcript][cds_coord_list[i]] = genome_coord_list[i];
-                globs['coords-rev'][transcript][genome_coord_list[i]] = cds_coord_list[i];
-            # Add the pairs of coordinates (CDS:genome) to the coords dict for this transcript
-
-            cds_coord += cur_exon_len;
-            # Increment the CDS coordinate by the length of the current CDS so the next CDS has the correct starting coord
-
-        # End CDS loop
-        ##########
-
-        globs['cds-seqs'][transcript] = cur_seq.upper();
-        # Save the current transcript sequence to the global seqs dict
-
-        # End transcript loop
-        ##########
-
-    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(globs['cds-seqs'])) + " CDS read");
+        else:
+            globs['cds-seqs'][transcript], globs['coords'][transcript], globs['annotation'][transcript].coding_start, globs['annotation'][transcript].start_frame = result;
+    # Save the sequence, coordinate table, and coding start and frame of each transcript
+
+    if report:
+        step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(globs['cds-seqs'])) + " CDS read");
     # Status update
 
     if transcripts_no_exons:
@@ -242,126 +507,329 @@ def extractCDS(globs):
             del globs['annotation'][rm_transcript];
     # Remove transcripts with problems, either no coding exons or mis-matched exon strands, from subsequent analyses
 
-    ####################
+    return globs;
+
+#############################################################################
 
-    if globs['write-cds'] or globs['write-cds-aa'] or globs['write-longest'] or globs['write-longest-aa']:
-        step = "Writing CDS sequences";
-        step_start_time = CORE.report_step(globs, step, False, "In progress...");
-        written = 0;
+def streamCDS(globs):
+# A generator for --stream that extracts the CDS of transcripts one genome region (e.g. chromosome) at a time.
+# For each region, the region sequence is read, the CDS of all transcripts in that region are extracted,
+# and the list of transcripts is yielded to degen.processCodons(). When the next region is requested, the sequences
+# and coordinates of the previous region are removed from memory, so memory use is bounded by the largest region.
+
+    regions = {};
+    for transcript in globs['annotation']:
+        regions.setdefault(globs['annotation'][transcript].header, []).append(transcript);
+    # Group the transcripts by the genome region they are in
+
+    if globs['genome-index']:
+        region_iter = ( (header, GENOME.getSeq(globs, header, 0, globs['genome-index'][header][0])) for header in regions );
+    else:
+        region_iter = iterFasta(globs['fa-file'], globs['seq-compression'], globs['seq-delim'], globs['num-procs'], as_bytes=True, first_word=True);
+    # For an indexed genome, read each region directly in the order they appear in the annotation
+    # Otherwise, read the genome one sequence at a time in the order they appear in the FASTA file
+
+    regions_done = set();
+    for header, region_seq in region_iter:
+        if header not in regions or header in regions_done:
+            continue;
+        # Skip genome sequences without any transcripts
+
+        step = "Extracting CDS from " + header;
+        step_start_time = CORE.report_step(globs, step, False, "In progress...", full_update=True);
+
+        globs['genome-seqs'] = { header : region_seq };
+        del(region_seq);
+        globs = extractCDS(globs, regions[header]);
+        # Extract the CDS from the current region
+
+        region_transcripts = [ transcript for transcript in regions[header] if transcript in globs['cds-seqs'] ];
+        step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(region_transcripts)) + " CDS read", full_update=True);
+
+        yield region_transcripts;
+        # Pass the transcripts in this region on to be processed
+
+        for transcript in region_transcripts:
+            del(globs['cds-seqs'][transcript]);
+            del(globs['coords'][transcript]);
+        globs['genome-seqs'] = {};
+        regions_done.add(header);
+        # Remove the sequences and coordinates of this region before reading the next one
+
+    for header in regions:
+        if header not in regions_done:
+            print();
+            CORE.errorOut("SEQ1", "Region in annotation file not found in genome file: " + header + ". Reminder: you can use -d to trim FASTA headers at a given character.", globs);
+    # If the genome wasn't indexed the headers couldn't be checked before streaming, so check here that all regions were found
+
+#############################################################################
+
+def exportCDS(globs):
+# Extracts the CDS of the transcripts and writes them with -c, -ca, -l, and -la. Each sequence is written as soon as
+# it is assembled rather than after all CDS are extracted, so only one transcript (or with --stream and a genome
+# that isn't indexed, one genome region) is held in memory at a time
+
+    step = "Extracting and writing CDS";
+    step_start_time = CORE.report_step(globs, step, False, "In progress...", full_update=globs['stream']);
+    written = 0;
+    transcripts_no_exons, rm_transcripts, no_frame_transcripts = [], [], [];
+    pool = None;
+
+    if globs['write-cds-aa'] or globs['write-longest-aa']:
+        from degenotate_lib.degen import readCodonTable
+        degen_table, codon_table = readCodonTable(globs['genetic-code-file']);
+        translator = Translator(codon_table);
+    # Read the genetic code and build the translation table if -ca or -la is specified
+
+    out_streams = {};
+    for opt in ['write-cds', 'write-cds-aa', 'write-longest', 'write-longest-aa']:
+        if globs[opt]:
+            out_streams[opt] = open(globs[opt], "w");
+    for opt in ['write-cds', 'write-longest']:
+        if globs[opt]:
+            out_streams[opt + '-coords'] = open(globs[opt] + globs['cds-coords-ext'], "w");
+            OUT.initializeCDSCoords(out_streams[opt + '-coords']);
+    # Open the files to be written, along with a file of the genome coordinates of each CDS for the nucleotide files
+
+    if globs['stream'] and not globs['genome-index']:
+        results = ( (transcript, (globs['cds-seqs'][transcript], globs['coords'][transcript], None, globs['annotation'][transcript].start_frame))
+                    for region_transcripts in streamCDS(globs) for transcript in region_transcripts );
+        # With --stream, the genome is read one region at a time and streamCDS() removes the CDS of each region before
+        # reading the next. Transcripts are written in the order of their regions in the genome file
+
+    elif globs['num-procs'] > 1 and len(globs['annotation']) >= EXTRACT_MIN_TRANSCRIPTS:
+        transcripts = list(globs['annotation']);
+        chunk_size = -(-len(transcripts) // (globs['num-procs'] * 4));
+        chunks = [ [ (transcript, globs['annotation'][transcript]) for transcript in transcripts[i:i+chunk_size] ] for i in range(0, len(transcripts), chunk_size) ];
+        # Split the transcripts into chunks in the order they are in the annotation
+
+        genome_source, shared_blocks = GENOME.shareGenome(globs);
+        pool = mp.Pool(processes=min(globs['num-procs'], len(chunks)), initializer=initExtractWorker, initargs=(genome_source, globs['complement']));
+        results = itertools.chain.from_iterable(pool.imap(extractGroup, chunks));
+        # With -p, assemble each chunk in a worker process and get the chunks back in order so they can be written as
+        # they finish
+
+    else:
+        tables = seqTables(globs['complement']);
+        results = ( (transcript, assembleCDS(globs, globs['annotation'][transcript], tables)) for transcript in globs['annotation'] );
+    # Get the assembled CDS of each transcript in turn
+
+    for transcript, result in results:
+        if result == "no-exons":
+            transcripts_no_exons.append(transcript);
+            continue;
+        elif result == "strands":
+            rm_transcripts.append(transcript);
+            continue;
+        # Skip transcripts with problems, either no coding exons or mis-matched exon strands
+
+        cds_seq, coord_map, extra_leading_nt = result[0], result[1], result[3];
+        if extra_leading_nt is None:
+            no_frame_transcripts.append(transcript);
+            continue;
+        # Get the frame of the current transcript and skip it if it is unknown
+
+        seq = cds_seq[extra_leading_nt:];
+        extra_trailing_nt = len(seq) % 3;
+        if extra_trailing_nt > 0:
+            seq = seq[:-extra_trailing_nt];
+        # Adjust the sequence based on the frame and being divisible by 3
 
         if globs['write-cds-aa'] or globs['write-longest-aa']:
-            from degenotate_lib.degen import readCodonTable
-            degen_table, codon_table = readCodonTable(globs['genetic-code-file']);
-        # Read the genetic code to translate sequences if -ca or -la is specified
+            aa_seq = translator.translate(seq);
+        # If an amino acid output has been specified, translate the sequence here
 
-        if globs['write-cds']:
-            nt_stream = open(globs['write-cds'], "w");
-        if globs['write-cds-aa']:
-            aa_stream = open(globs['write-cds-aa'], "w");
-        if globs['write-longest']:
-            nt_long_stream = open(globs['write-longest'], "w");
-        if globs['write-longest-aa']:
-            aa_long_stream = open(globs['write-longest-aa'], "w");
-        # Open the files to be written
-
-        for transcript in globs['cds-seqs']:
-            extra_leading_nt = globs['annotation'][transcript]['start-frame'];
-            if extra_leading_nt is None:
-                CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + transcript + " has an unknown frame....skipping");
-                globs['warnings'] += 1;                    
-                continue;
-            # Get the frame of the current transcript and print a warning if it is unknown
-
-            seq = globs['cds-seqs'][transcript][extra_leading_nt:];
-            extra_trailing_nt = len(seq) % 3;
-            if extra_trailing_nt > 0:
-                seq = seq[:-extra_trailing_nt];
-            # Adjust the sequence based on the frame and being divisible by 3
-
-            if globs['write-cds-aa'] or globs['write-longest-aa']:
-                aa_seq = bioTranslator(seq, codon_table);
-            # If an amino acid output has been specified, translate the sequence here
-
-            if globs['write-cds']:
-                OUT.writeSeq(">" + transcript, seq, nt_stream);
-            if globs['write-cds-aa']: 
-                OUT.writeSeq(">" + transcript, aa_seq, aa_stream);
-            # Write the nucleotide sequence
-
-            if globs['annotation'][transcript]['longest'] == "yes":
-                if globs['write-longest']:
-                    OUT.writeSeq(">" + transcript, seq, nt_long_stream);
-                if globs['write-longest-aa']:
-                    OUT.writeSeq(">" + transcript, aa_seq, aa_long_stream);
-            # Write the sequence if it is the longest isoform
-
-            written += 1;
-        ## End sequence writing loop
+        if globs['write-cds'] or globs['write-longest']:
+            coord_line = OUT.compileCDSCoordsLine(transcript, globs['annotation'][transcript].header, coord_map, extra_leading_nt, extra_trailing_nt);
+        # The genome coordinates of the trimmed sequence for the nucleotide outputs
 
         if globs['write-cds']:
-            nt_stream.close();
-        if globs['write-cds-aa']:
-            aa_stream.close();
-        if globs['write-longest']:
-            nt_long_stream.close();
-        if globs['write-longest-aa']:
-            aa_long_stream.close();
-        # Close all open files
-
-        step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(written) + " sequences written");
-    # Writes extracted CDS seqs to a provided file with options -c, -ca, -l, -la
-    ####################
+            OUT.writeSeq(">" + transcript, seq, out_streams['write-cds']);
+            out_streams['write-cds-coords'].write(coord_line);
+        if globs['write-cds-aa']: 
+            OUT.writeSeq(">" + transcript, aa_seq, out_streams['write-cds-aa']);
+        # Write the nucleotide and amino acid sequences
+
+        if globs['annotation'][transcript].longest == "yes":
+            if globs['write-longest']:
+                OUT.writeSeq(">" + transcript, seq, out_streams['write-longest']);
+                out_streams['write-longest-coords'].write(coord_line);
+            if globs['write-longest-aa']:
+                OUT.writeSeq(">" + transcript, aa_seq, out_streams['write-longest-aa']);
+        # Write the sequence if it is the longest isoform
+
+        written += 1;
+    ## End sequence writing loop
+
+    if pool:
+        pool.close();
+        pool.join();
+        for shared_block in shared_blocks:
+            shared_block.close();
+            shared_block.unlink();
+    # Shut down the worker processes and remove the shared copy of the genome
+
+    for opt in out_streams:
+        out_streams[opt].close();
+    # Close all open files
+
+    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(written) + " sequences written", full_update=globs['stream']);
+    # Status update
+
+    for no_exon_transcript in transcripts_no_exons:
+        CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + no_exon_transcript + " has no coding exons associated with it and will be REMOVED from subsequent analyses.");
+        globs['warnings'] += 1;
+    for rm_transcript in rm_transcripts:
+        CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + rm_transcript + " contains exons annotated on differing strands. This transcript will be REMOVED from subsequent analyses.");
+        globs['warnings'] += 1;
+    for no_frame_transcript in no_frame_transcripts:
+        CORE.printWrite(globs['logfilename'], 3, "# WARNING: transcript " + no_frame_transcript + " has an unknown frame....skipping");
+        globs['warnings'] += 1;
+    # Warnings for the transcripts that were skipped, after the status update so they don't break up the line
 
     return globs;
 
 #############################################################################
 
-def readCDS(globs):
-    
-    step = "Reading CDS FASTA file(s)";
-    step_start_time = CORE.report_step(globs, step, False, "In progress...", full_update=True);
+def seqFileCompression(filename):
+# Gets the compression of a sequence file from its extension, only opening the file to check if the extension
+# doesn't tell us
+
+    if filename.endswith(".gz"):
+        return "gz";
+    elif filename.endswith(".bz2"):
+        return "bz2";
+    elif filename.endswith(".zst"):
+        return "zstd";
+    elif any(filename.endswith(fasta_ext) for fasta_ext in [".fa", ".fasta", ".fna"]):
+        return "none";
+    else:
+        return CORE.detectCompression(filename);
+    # DECOMP.openFile() reads gzip and BGZF files the same way with one thread, so they don't need to be distinguished here
+
+#############################################################################
+
+def readCDSFile(seq_file_path):
+# Reads the sequences in one CDS file. This is run by the worker processes when reading a directory with -p
+
+    cur_seqs = {};
+    for header, seq in iterFasta(seq_file_path, seqFileCompression(seq_file_path), False):
+        cur_seqs[header] = seq.upper();
+
+    return cur_seqs;
+
+#############################################################################
+
+def getCDSFiles(globs):
+# Gets the list of CDS files to read from the input (-s) and their paths
 
     if globs['in-seq-type'] == "directory":
-        seq_files = [ f for f in os.listdir(globs['in-seq']) if any(f.endswith(fasta_ext) for fasta_ext in [".fa", ".fa.gz", ".fasta", ".fasta.gz", ".fna", ".fna.gz"]) ];
+        seq_files = sorted([ f for f in os.listdir(globs['in-seq']) if any(f.endswith(fasta_ext) for fasta_ext in [ fasta_ext + compression_ext for fasta_ext in [".fa", ".fasta", ".fna"] for compression_ext in ["", ".gz", ".bz2", ".zst"] ]) ]);
+        seq_file_paths = [ os.path.join(globs['in-seq'], seq_file) for seq_file in seq_files ];
         ## TODO: Make sure these are all the plausible extensions.
         ## TODO: Add extension lists to globs so they aren't all typed out here?
         ## NOTE: Do we even want to do this check?
     else:
         seq_files = [globs['in-seq']];
+        seq_file_paths = seq_files;
     # Get a list of files from the input
-    # If the input is a directory, this will be all files in that directory
+    # If the input is a directory, this will be all files in that directory, sorted so sequences are always read in the same order
     # If the input is a file, this will just be a list with only that file in it
 
     if seq_files == []:
         CORE.errorOut("SEQ3", "No files in the input have extensions indicating they are FASTA files.", globs);
     # Makes sure some files have been read    
 
-    for seq_file in seq_files:
-        if globs['in-seq-type'] == "directory":
-            seq_file_path = os.path.join(globs['in-seq'], seq_file);
-        else:
-            seq_file_path = seq_file;
-        # For multiple input sequence files (directory), the path will be that directory and the current file
+    if globs['in-seq'] == "-" and seqFileCompression("-") == "zip":
+        CORE.errorOut("SEQ5", "Zip compressed sequences can't be read from stdin (-s -). Unzip the file first or use another compression.", globs);
+    # Zip archives need random access to read the list of files at the end of the archive
+
+    return seq_files, seq_file_paths;
+
+#############################################################################
+
+def readCDSCoords(globs):
+# Reads the genome coordinates of each CDS from the file written alongside the -c and -l output and given with
+# --cds-coords. With this, the output of -s is in genome coordinates and variants can be read from a VCF file
+# without the genome or annotation
+
+    step = "Reading CDS coordinates";
+    step_start_time = CORE.report_step(globs, step, False, "In progress...");
+
+    with open(globs['cds-coords']) as coordsfile:
+        for line in coordsfile:
+            if line.startswith("#") or not line.strip():
+                continue;
+            line = line.rstrip("\n").split("\t");
+            # Skip the header and read the columns
+
+            try:
+                transcript, region, strand, start_frame, blocks = line;
+                blocks = [ tuple(map(int, block.split("-"))) for block in blocks.split(",") if block ];
+                start_frame = int(start_frame);
+                assert strand in ("+", "-") and all(len(block) == 2 for block in blocks);
+            except (ValueError, AssertionError):
+                print();
+                CORE.errorOut("SEQ4", "Invalid line in the CDS coordinates file (--cds-coords): " + "\t".join(line), globs);
+            # Parse the blocks and make sure the line is as written by -c or -l
+
+            globs['coords'][transcript] = COORDS.fromBlocks(strand, blocks);
+            # The coordinate table for the CDS
+
+            if blocks:
+                start, end = min(block[0] for block in blocks), max(block[1] for block in blocks);
+            else:
+                start, end = 1, 0;
+            globs['annotation'][transcript] = GXF.Transcript(region, start, end, strand, transcript);
+            globs['annotation'][transcript].start_frame = start_frame;
+            # The region and span of the CDS, used to look up variants
+
+    step_start_time = CORE.report_step(globs, step, step_start_time, "Success: " + str(len(globs['coords'])) + " CDS coordinates read");
+    # Status update
+
+    return globs;
 
-        cur_seqs = readFasta(seq_file_path, CORE.detectCompression(seq_file_path), False);
-        # Read sequences in current file
-        # Not sure if it is necessary to do the compression detections for each file... seems to take a while
+#############################################################################
 
+def readCDS(globs):
+    
+    step = "Reading CDS FASTA file(s)";
+    step_start_time = CORE.report_step(globs, step, False, "In progress...", full_update=True);
+
+    seq_files, seq_file_paths = getCDSFiles(globs);
+    # Get the list of files to read
+
+    pool = False;
+    if globs['num-procs'] > 1 and len(seq_file_paths) > 1:
+        pool = mp.Pool(processes=min(globs['num-procs'], len(seq_file_paths)));
+        file_seqs = pool.imap(readCDSFile, seq_file_paths, chunksize=max(1, len(seq_file_paths) // (globs['num-procs'] * 16)));
+    else:
+        file_seqs = map(readCDSFile, seq_file_paths);
+    # With -p, read the files with a pool of worker processes. imap() returns the sequences from each file in the same
+    # order as the list of files, so the results are merged in the same order regardless of the number of processes
+    # Files are sent to the workers in chunks since CDS files are usually small
+
+    for seq_file, cur_seqs in zip(seq_files, file_seqs):
         if len(cur_seqs) == 0:
             CORE.printWrite(globs['logfilename'], globs['log-v'], "# WARNING: file " + seq_file + " doesn't appear to be FASTA formatted... skipping");
             globs['warnings'] += 1;
             continue;
         # Check if we have actually read any sequence
 
-        for seq in cur_seqs:
-            # if len(cur_seqs[seq]) % 3 != 0:
-            #     CORE.printWrite(globs['logfilename'], globs['log-v'], "# WARNING: sequence " + seq + " in file " + seq_file + " isn't in frame 1... skipping");
-            #     globs['warnings'] += 1;
-            #     continue;
-            # Check that the current sequence is in frame 1
+        # for seq in cur_seqs:
+        #     if len(cur_seqs[seq]) % 3 != 0:
+        #         CORE.printWrite(globs['logfilename'], globs['log-v'], "# WARNING: sequence " + seq + " in file " + seq_file + " isn't in frame 1... skipping");
+        #         globs['warnings'] += 1;
+        #         continue;
+        # Check that the current sequence is in frame 1
 
-            globs['cds-seqs'][seq] = cur_seqs[seq].upper();
-            # Add the current sequence to the global sequence dict
+        globs['cds-seqs'].update(cur_seqs);
+        # Add the sequences in the current file to the global sequence dict
+
+    if pool:
+        pool.close();
+        pool.join();
+    # Shut down the worker processes
 
     if not globs['cds-seqs']:
        CORE.errorOut("SEQ3", "No FASTA sequences were read from input. Exiting.", globs); 
@@ -372,4 +840,39 @@ def readCDS(globs):
 
     return globs;
 
-#############################################################################
\ No newline at end of file
+#############################################################################
+
+def streamCDSFiles(globs):
+# A generator for --stream with -s that reads the CDS files one sequence at a time. Each sequence is added to
+# globs['cds-seqs'] and yielded to degen.processCodons(), then removed when the next sequence is read, so only one
+# sequence is held in memory at once.
+
+    seq_files, seq_file_paths = getCDSFiles(globs);
+    # Get the list of files to read
+
+    num_seqs = 0;
+    for seq_file, seq_file_path in zip(seq_files, seq_file_paths):
+        file_seqs = 0;
+        for header, seq in iterFasta(seq_file_path, seqFileCompression(seq_file_path), False, globs['num-procs']):
+            globs['cds-seqs'] = { header : seq.upper() };
+            yield [header];
+            # Pass the current sequence on to be processed
+
+            file_seqs += 1;
+        ## End sequence loop
+
+        globs['cds-seqs'] = {};
+
+        if file_seqs == 0:
+            CORE.printWrite(globs['logfilename'], globs['log-v'], "# WARNING: file " + seq_file + " doesn't appear to be FASTA formatted... skipping");
+            globs['warnings'] += 1;
+        # Check if we have actually read any sequence
+
+        num_seqs += file_seqs;
+    ## End file loop
+
+    if num_seqs == 0:
+       CORE.errorOut("SEQ3", "No FASTA sequences were read from input. Exiting.", globs); 
+    # If no sequences were read from the input, error out
+
+#############################################################################
@@ -0,0 +1,253 @@
+#############################################################################
+# Functions for the packed 2-bit genome cache for degenotate
+# The cache stores each genome sequence with 2 bits per base, along with the runs of N, the
+# soft-masked (lowercase) runs, and the positions of any other characters (e.g. IUPAC codes), so the
+# exact genome sequence can be rebuilt from it. The cache is memory-mapped, so exons are sliced from
+# it without reading the whole file, and several runs on the same genome can share one page-cached copy.
+#############################################################################
+
+import sys
+import os
+import re
+import mmap
+import struct
+from bisect import bisect_left, bisect_right
+
+#############################################################################
+
+MAGIC = b"DGC\x01";
+# The first bytes of a cache file, including the version of the format
+
+HEADER = struct.Struct("<4sQqQ");
+# The cache header: <magic> <size of the FASTA file> <mtime of the FASTA file in ns> <offset of the sequence table>
+
+ENTRY = struct.Struct("<QQQQQQQQ");
+# An entry in the sequence table (after the length and bytes of the sequence name):
+# <length> <offset of packed bases> <number of N runs> <offset of N runs> <number of masked runs> <offset of masked runs>
+# <number of other characters> <offset of other characters>
+# Runs are stored as an array of start positions followed by an array of end positions (end exclusive), and other
+# characters as an array of positions followed by the characters themselves
+
+PACK_TABLE = bytes(b"0123"["ACGT".find(chr(byte))] if chr(byte) in "ACGT" else ord("0") for byte in range(256));
+# Translates uppercase bases to base 4 digits for packing. Any other byte is overwritten with "0" (A) since N and
+# other characters are stored separately
+
+UNPACK_TABLES = [ "".join( "ACGT"[(byte >> shift) & 3] for byte in range(256) ).encode() for shift in (6, 4, 2, 0) ];
+# For each of the 4 bases in a packed byte (from the high bits to the low bits), a table that translates
+# the packed byte to that base
+
+#############################################################################
+
+def cacheFile(fa_file):
+# The name of the cache file for a genome FASTA file
+    return fa_file + ".dgc";
+
+#############################################################################
+
+def fastaStamp(fa_file):
+# The size and modification time of the FASTA file, which are stored in the cache to check it is up to date
+    fa_stat = os.stat(fa_file);
+    return fa_stat.st_size, fa_stat.st_mtime_ns;
+
+#############################################################################
+
+def checkCache(fa_file):
+# Returns True if the cache for the FASTA file exists and was built from the current version of the file
+
+    cache_file = cacheFile(fa_file);
+    if not os.path.isfile(cache_file):
+        return False;
+
+    with open(cache_file, "rb") as cache_stream:
+        header = cache_stream.read(HEADER.size);
+
+    if len(header) < HEADER.size:
+        return False;
+
+    magic, fa_size, fa_mtime, table_offset = HEADER.unpack(header);
+    return magic == MAGIC and (fa_size, fa_mtime) == fastaStamp(fa_file);
+
+#############################################################################
+
+def writeArray(cache_stream, values):
+# Writes a list of integers to the cache, aligned to 8 bytes so it can be memory-mapped as an array.
+# Returns the offset the array was written at.
+
+    pad = -cache_stream.tell() % 8;
+    cache_stream.write(b"\x00" * pad);
+    offset = cache_stream.tell();
+    cache_stream.write(struct.pack("<" + str(len(values)) + "Q", *values));
+
+    return offset;
+
+#############################################################################
+
+def packSeq(seq):
+# Packs the sequence (as uppercase bytes) into 2 bits per base, 4 bases per byte with the first base in the high bits
+
+    if not seq:
+        return b"";
+
+    digits = seq.translate(PACK_TABLE);
+    digits += b"0" * (-len(digits) % 4);
+    # Convert each base to a base 4 digit, and pad the sequence to a whole number of bytes
+
+    return int(digits, 4).to_bytes(len(digits) // 4, "big");
+    # Converting the base 4 string as one big integer packs the bases in linear time
+
+#############################################################################
+
+def buildCache(seq_iter, fa_file):
+# Builds the cache for a FASTA file from an iterator of (name, sequence) tuples. The cache is written to a
+# temporary file which is then moved into place, so other runs never see a partial cache. Returns the number of
+# sequences in the cache.
+
+    cache_file = cacheFile(fa_file);
+    tmp_file = cache_file + "." + str(os.getpid()) + ".tmp";
+    fa_size, fa_mtime = fastaStamp(fa_file);
+
+    entries = [];
+    # The sequence table
+
+    try:
+        with open(tmp_file, "wb") as cache_stream:
+            cache_stream.write(HEADER.pack(MAGIC, fa_size, fa_mtime, 0));
+
+            for name, seq in seq_iter:
+                seq = seq.encode();
+                upper_seq = seq.upper();
+
+                packed_offset = cache_stream.tell();
+                cache_stream.write(packSeq(upper_seq));
+                # Write the packed bases
+
+                n_runs = [ match.span() for match in re.finditer(rb"N+", upper_seq) ];
+                mask_runs = [ match.span() for match in re.finditer(rb"[a-z]+", seq) ];
+                others = [ (match.start(), match.group()) for match in re.finditer(rb"[^ACGTN]", upper_seq) ];
+                # Find the runs of N, the soft-masked runs, and any other characters that can't be packed
+
+                n_offset = writeArray(cache_stream, [ run[0] for run in n_runs ] + [ run[1] for run in n_runs ]);
+                mask_offset = writeArray(cache_stream, [ run[0] for run in mask_runs ] + [ run[1] for run in mask_runs ]);
+                other_offset = writeArray(cache_stream, [ pos for pos, char in others ]);
+                cache_stream.write(b"".join( char for pos, char in others ));
+                # Write the runs and other characters
+
+                entries.append((name, ENTRY.pack(len(seq), packed_offset, len(n_runs), n_offset, len(mask_runs), mask_offset, len(others), other_offset)));
+            ## End sequence loop
+
+            table_offset = cache_stream.tell();
+            cache_stream.write(struct.pack("<Q", len(entries)));
+            for name, entry in entries:
+                name = name.encode();
+                cache_stream.write(struct.pack("<H", len(name)) + name + entry);
+            # Write the sequence table at the end of the file
+
+            cache_stream.seek(0);
+            cache_stream.write(HEADER.pack(MAGIC, fa_size, fa_mtime, table_offset));
+            # Fill in the offset of the table in the header
+
+        os.replace(tmp_file, cache_file);
+    except:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file);
+        raise;
+    # Make sure a partial cache isn't left behind if anything goes wrong
+
+    return len(entries);
+
+#############################################################################
+
+class CachedGenome:
+# A read-only genome backed by a memory-mapped cache file. seqs holds the length and offsets of each sequence,
+# and getSeq() rebuilds any part of a sequence from its packed bases, runs and other characters.
+
+    def __init__(self, fa_file):
+        self.stream = open(cacheFile(fa_file), "rb");
+        self.data = mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ);
+        self.view = memoryview(self.data);
+        self.arrays = [];
+
+        magic, fa_size, fa_mtime, table_offset = HEADER.unpack_from(self.data, 0);
+        num_seqs = struct.unpack_from("<Q", self.data, table_offset)[0];
+        pos = table_offset + 8;
+
+        self.seqs = {};
+        for i in range(num_seqs):
+            name_len = struct.unpack_from("<H", self.data, pos)[0];
+            name = self.data[pos+2:pos+2+name_len].decode();
+            pos += 2 + name_len;
+            seq_len, packed_offset, num_n, n_offset, num_mask, mask_offset, num_other, other_offset = ENTRY.unpack_from(self.data, pos);
+            pos += ENTRY.size;
+
+            self.seqs[name] = {
+                'len' : seq_len,
+                'packed' : packed_offset,
+                'n-starts' : self.array(n_offset, num_n),
+                'n-ends' : self.array(n_offset + num_n * 8, num_n),
+                'mask-starts' : self.array(mask_offset, num_mask),
+                'mask-ends' : self.array(mask_offset + num_mask * 8, num_mask),
+                'other-pos' : self.array(other_offset, num_other),
+                'other-chars' : other_offset + num_other * 8
+            };
+        # Read the sequence table. The runs and positions are views of the memory-mapped file, so nothing is copied
+        # until they are needed
+
+    def array(self, offset, length):
+    # A view of an array of integers in the cache
+        array_view = self.view[offset : offset + length * 8].cast("Q");
+        self.arrays.append(array_view);
+        return array_view;
+
+    def getSeq(self, name, start, end):
+    # Returns the sequence as bytes from start to end (0-based, end exclusive) for the given sequence name
+        seq_info = self.seqs[name];
+
+        end = min(end, seq_info['len']);
+        if start >= end:
+            return b"";
+        # Python slice semantics for coordinates past the end of the sequence
+
+        byte_start = start // 4;
+        packed = self.data[seq_info['packed'] + byte_start : seq_info['packed'] + (end + 3) // 4];
+        seq = bytearray(len(packed) * 4);
+        for i in range(4):
+            seq[i::4] = packed.translate(UNPACK_TABLES[i]);
+        # Unpack the bytes that contain the region, filling in every 4th base from each position in the packed bytes
+
+        offset = byte_start * 4;
+        # The position in the full sequence of the first unpacked base
+
+        starts, ends = seq_info['n-starts'], seq_info['n-ends'];
+        run = bisect_right(ends, start);
+        while run < len(starts) and starts[run] < end:
+            run_start, run_end = max(starts[run], start) - offset, min(ends[run], end) - offset;
+            seq[run_start:run_end] = b"N" * (run_end - run_start);
+            run += 1;
+        # Fill in the N runs that overlap the region
+
+        positions = seq_info['other-pos'];
+        i = bisect_left(positions, start);
+        while i < len(positions) and positions[i] < end:
+            seq[positions[i] - offset] = self.data[seq_info['other-chars'] + i];
+            i += 1;
+        # Fill in any other characters in the region
+
+        starts, ends = seq_info['mask-starts'], seq_info['mask-ends'];
+        run = bisect_right(ends, start);
+        while run < len(starts) and starts[run] < end:
+            run_start, run_end = max(starts[run], start) - offset, min(ends[run], end) - offset;
+            seq[run_start:run_end] = seq[run_start:run_end].lower();
+            run += 1;
+        # Lowercase the soft-masked runs that overlap the region
+
+        return bytes(seq[start-offset:end-offset]);
+
+    def close(self):
+        for array_view in self.arrays:
+            array_view.release();
+        self.view.release();
+        self.data.close();
+        self.stream.close();
+    # The views of the memory-mapped file have to be released before it can be closed
+
+#############################################################################
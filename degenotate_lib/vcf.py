@@ -23,12 +23,6 @@ def read(globs):
     globs['vcf'] = VariantFile(globs['vcf-file']);
     # Read the VCF
 
-    for header in globs['vcf'].header.contigs:
-        if header not in globs['genome-seqs']:
-            CORE.printWrite(globs['logfilename'], 3, "# WARNING: " + header + " is present in the VCF file but not the genome fasta file.");
-            globs['warnings'] += 1;  
-    # Add warnings for each header in the VCF file that isn't in the input fasta file
-
     exclude_missing = [ sample for sample in globs['vcf-exclude'] if sample not in globs['vcf'].header.samples ];
     if exclude_missing:
         CORE.printWrite(globs['logfilename'], globs['log-v'], "# WARNING: some samples specified to be exclude (-e) were not found in the VCF file: " + ",".join(exclude_missing));
@@ -59,24 +53,17 @@ def read(globs):
     # Calculate the default MAF cutoff here if none is provided (1 / N)
     ## Ingroups
 
+    if globs['haplotypes']:
+        globs['haplotype-samples'] = [ sample for sample in globs['vcf'].header.samples if sample not in globs['vcf-exclude'] ];
+    # With --haplotypes, the haplotypes of all samples except the excluded ones are applied to the CDS
+    ## Haplotypes
+
     return globs;
 
 #############################################################################
 
-def getVariants(globs, transcript, transcript_region, codons, extra_leading_nt, extra_trailing_nt):
-# Gets variant codons in the in- and outgroups
-
-    mk_codons = { c : { 'poly' : [], 'fixed' : list(codons[c]), 'fixed-flag' : False, 'AF' : [] } for c in range(len(codons)) };
-    #mk_codons = { c : { 'ingroup-poly-samples' : [], 'ingroup-ref-samples' : [], 'poly' : defaultdict(int), 'fixed' : list(codons[c]), 'fixed-flag' : False } for c in range(len(codons)) };
-    #mk_codons = { c : { 'ref' : { codons[c] : 0 }, 'poly' : {}, 'fixed' : list(codons[c]), 'fixed-flag' : False } for c in range(len(codons)) };
-    # This dictionary will keep track of polymorphic codons and their frequencies (initialized as empty dict)
-    # and fixed difference codons (initialized as reference codon) for each codon in the current transcript
-    # The fixed flag is swapped to True if any fixed differences have actually been found, else
-    # the codon is still the ref and shouldn't be counted
-    # Also keeps track of which samples in the ingroup have at least 1 polymorphism in the codon (ingroup-poly-samples) and samples that are reference for each position in the codon (ingroup-ref-samples)
-
-    strand = globs['annotation'][transcript]['strand'];
-    # Need to get strand, to convert leading/trailing bases into start/end padding
+def transcriptPads(strand, extra_leading_nt, extra_trailing_nt):
+# Converts the number of leading and trailing bases out of frame in a transcript to the padding at its genomic start and end
 
     if strand == "+":
         start_pad = extra_leading_nt;
@@ -88,49 +75,76 @@ def getVariants(globs, transcript, transcript_region, codons, extra_leading_nt,
     # Extra leading nt and trailing nt are defined (leading, trailing) based on transcript orientation
     # So in genomic coordinates, trailing nt on the minus strand is actually a shift of the start, and leading nt is a shift of the end
     # This is because for the transcript feature, start < end
-    
-    adj_ts_start = globs['annotation'][transcript]['start'] + start_pad;
-    adj_ts_end = globs['annotation'][transcript]['end'] - end_pad;
+
+    return start_pad, end_pad;
+
+#############################################################################
+
+def cdsRecords(globs, transcript, transcript_region, extra_leading_nt, extra_trailing_nt):
+# Fetches the SNP records in the CDS of a transcript from the VCF, yielding each one with its position in the CDS.
+# The records are read once per transcript and used by both getVariants() and getHaplotypes()
+
+    start_pad, end_pad = transcriptPads(globs['annotation'][transcript].strand, extra_leading_nt, extra_trailing_nt);
+    adj_ts_start = globs['annotation'][transcript].start + start_pad;
+    adj_ts_end = globs['annotation'][transcript].end - end_pad;
     # Adjust the genomic start and end coordinates for this transcript based on 
     # the extra out of frame nts in the transcript
 
-    transcript_records = globs['vcf'].fetch(transcript_region, adj_ts_start, adj_ts_end);
-    # Look up all variant records in the range of the adjusted transcript start and end coordinates
+    transcript_records = globs['vcf'].fetch(transcript_region, adj_ts_start - 1, adj_ts_end);
+    # Look up all variant records in the range of the adjusted transcript start and end coordinates. pysam takes a
+    # 0-based start, so subtract 1 from the 1-based start to include a variant at the first base
 
     for rec in transcript_records:
 
-        alt_nts = rec.alts;
-        if not alt_nts:
+        if not rec.alts:
             continue;
-        # Look up the alleles at the current position and if there are no alternate alleles (invariant site), skip
+        # If there are no alternate alleles (invariant site), skip
 
-        if not all(len(alt) == 1 for alt in alt_nts):
+        if not all(len(alt) == 1 for alt in rec.alts):
             CORE.printWrite(globs['logfilename'], 3, "# WARNING: invalid allele in VCF file at position " + str(rec.start + 1) + "....skipping");
             globs['warnings'] += 1;
             continue;
         # A warning for alternate alleles that are longer than one base (indels, svs)
 
-        if strand == "-":
-            alt_nts = [ globs['complement'][base] for base in alt_nts ];
-        # For transcripts on the negative strand, the alternate alleles in the VCF
-        # need to be complemented
-
-        rec_pos = rec.start + 1
-        # Adjust 0-based pysam coordinate to 1-based gff coordinate here
-
-        if rec_pos not in globs['coords-rev'][transcript]:
+        rec_transcript_pos = globs['coords'][transcript].toCDS(rec.start + 1);
+        if rec_transcript_pos is None:
             continue;
-        # Skip any SNPs within the range of the transcript start and end,
+        # Look up the position of the record relative to the start of the transcript (adjusting the 0-based pysam
+        # coordinate to 1-based gff coordinate), and skip any SNPs within the range of the transcript start and end,
         # but not in the CDS
 
-        rec_transcript_pos = globs['coords-rev'][transcript][rec_pos];
-        # Look up the position of the record relative to the start of
-        # the transcript
+        yield rec, rec_transcript_pos;
+
+#############################################################################
+
+def getVariants(globs, transcript, codons, extra_leading_nt, cds_records):
+# Gets variant codons in the in- and outgroups from the records in the CDS of the transcript (from cdsRecords())
+
+    mk_codons = { c : { 'poly' : [], 'fixed' : list(codons[c]), 'fixed-flag' : False, 'AF' : [] } for c in range(len(codons)) };
+    #mk_codons = { c : { 'ingroup-poly-samples' : [], 'ingroup-ref-samples' : [], 'poly' : defaultdict(int), 'fixed' : list(codons[c]), 'fixed-flag' : False } for c in range(len(codons)) };
+    #mk_codons = { c : { 'ref' : { codons[c] : 0 }, 'poly' : {}, 'fixed' : list(codons[c]), 'fixed-flag' : False } for c in range(len(codons)) };
+    # This dictionary will keep track of polymorphic codons and their frequencies (initialized as empty dict)
+    # and fixed difference codons (initialized as reference codon) for each codon in the current transcript
+    # The fixed flag is swapped to True if any fixed differences have actually been found, else
+    # the codon is still the ref and shouldn't be counted
+    # Also keeps track of which samples in the ingroup have at least 1 polymorphism in the codon (ingroup-poly-samples) and samples that are reference for each position in the codon (ingroup-ref-samples)
+
+    strand = globs['annotation'][transcript].strand;
+    # Need to get strand to complement the alleles on the negative strand
+
+    for rec, rec_transcript_pos in cds_records:
+
+        alt_nts = rec.alts;
+        if strand == "-":
+            alt_nts = [ globs['complement'][base] for base in alt_nts ];
+        # Look up the alleles at the current position. For transcripts on the negative strand, the alternate alleles
+        # in the VCF need to be complemented
 
-        adj_rec_pos = rec_transcript_pos - start_pad;
-        # Adjust the transcript position based on the number of extra leading nts
+        adj_rec_pos = rec_transcript_pos - extra_leading_nt;
+        # Adjust the transcript position based on the number of extra leading nts. The CDS position is already in
+        # transcript orientation, so this is the same on both strands (and the same position used by getHaplotypes())
 
-        if adj_rec_pos < 1:
+        if adj_rec_pos < 0:
             continue;
         #if the variant is in the partial starting codon, skip it
 
@@ -265,4 +279,47 @@ def getVariants(globs, transcript, transcript_region, codons, extra_leading_nt,
 
 #############################################################################
 
+def getHaplotypes(globs, transcript, cds_records, extra_leading_nt, cds_len):
+# With --haplotypes, gets the bases that differ from the reference in each haplotype of each sample from the records
+# in the CDS of the transcript (from cdsRecords()). Returns a dict of { <position in the in-frame CDS> : <base> } for
+# each (<sample>, <haplotype 1 or 2>), and the number of heterozygous genotypes that weren't phased, which are left
+# as the reference
+
+    strand = globs['annotation'][transcript].strand;
+    hap_changes = { (sample, hap_num) : {} for sample in globs['haplotype-samples'] for hap_num in (1, 2) };
+    unphased = 0;
+
+    for rec, rec_transcript_pos in cds_records:
+        cds_pos = rec_transcript_pos - extra_leading_nt;
+        if cds_pos < 0 or cds_pos >= cds_len:
+            continue;
+        # Skip variants in the leading or trailing bases that aren't part of a full codon
+
+        for sample in globs['haplotype-samples']:
+            call = rec.samples[sample];
+            if not call.phased and len(set(call['GT'])) > 1:
+                unphased += 1;
+                continue;
+            # Heterozygous genotypes can only be assigned to a haplotype if they are phased
+
+            for hap_num, allele in zip((1, 2), call['GT']):
+                if not allele:
+                    continue;
+                # Skip reference alleles and missing data
+
+                base = rec.alleles[allele].upper();
+                if base not in globs['complement']:
+                    continue;
+                if strand == "-":
+                    base = globs['complement'][base];
+                # For transcripts on the negative strand, the alternate alleles need to be complemented
+
+                hap_changes[(sample, hap_num)][cds_pos] = base;
+        ## End sample loop
+    ## End record loop
+
+    return hap_changes, unphased;
+
+#############################################################################
+
 
@@ -0,0 +1,45 @@
+#############################################################################
+# Shared helpers for the degenotate tests, which run degenotate.py on small generated inputs
+#############################################################################
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+DEGENOTATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "degenotate.py");
+
+#############################################################################
+
+@pytest.fixture
+def run_degenotate(tmp_path):
+# Returns a function that runs degenotate with the given arguments and fails the test if it doesn't finish
+# degenotate is run in the test's temporary directory, so any error log is written there
+
+    def run(*args):
+        result = subprocess.run([sys.executable, DEGENOTATE] + [ str(arg) for arg in args ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=tmp_path);
+        assert result.returncode == 0, result.stdout;
+
+    return run;
+
+#############################################################################
+
+def writeGenome(filename, seq, header="chr1 test genome"):
+# Writes a genome FASTA file with a single sequence
+
+    with open(filename, "w") as genome_file:
+        genome_file.write(">" + header + "\n");
+        for i in range(0, len(seq), 60):
+            genome_file.write(seq[i:i+60] + "\n");
+
+#############################################################################
+
+def writeGFF(filename, features, region="chr1"):
+# Writes a GFF file from a list of (<feature type>, <start>, <end>, <strand>, <phase>, <attributes>) tuples
+
+    with open(filename, "w") as gff_file:
+        for feature_type, start, end, strand, phase, info in features:
+            gff_file.write("\t".join([region, "test", feature_type, str(start), str(end), ".", strand, phase, info]) + "\n");
+
+#############################################################################
@@ -0,0 +1,60 @@
+#############################################################################
+# Tests for reading the CDS coordinates written with -c back in with -s --cds-coords
+#############################################################################
+
+import random
+
+from conftest import writeGenome, writeGFF
+
+#############################################################################
+
+def writeInputs(tmp_path):
+# Writes a small genome and an annotation with two partial transcripts whose first CDS doesn't start in frame 0,
+# one on each strand, each with two coding exons
+
+    random.seed(7);
+    writeGenome(tmp_path / "genome.fa", "".join(random.choice("ACGT") for i in range(400)));
+
+    writeGFF(tmp_path / "ann.gff3", [
+        ("mRNA", 11, 190, "+", ".", "ID=t1;Parent=g1"),
+        ("CDS", 11, 80, "+", "1", "Parent=t1"),
+        ("CDS", 101, 190, "+", "0", "Parent=t1"),
+        ("mRNA", 201, 390, "-", ".", "ID=t2;Parent=g2"),
+        ("CDS", 301, 390, "-", "2", "Parent=t2"),
+        ("CDS", 201, 271, "-", "1", "Parent=t2"),
+    ]);
+
+#############################################################################
+
+def readBed(filename):
+# Reads the lines of a bed output file
+    with open(filename) as bed_file:
+        return bed_file.read().splitlines();
+
+#############################################################################
+
+def test_cds_coords_frame_offset(tmp_path, run_degenotate):
+# The sites from -s with --cds-coords should be the same as from the annotation for the bases in frame,
+# including the transcript positions of CDS that don't start in frame 0
+
+    writeInputs(tmp_path);
+    genome, annotation = tmp_path / "genome.fa", tmp_path / "ann.gff3";
+
+    run_degenotate("-a", annotation, "-g", genome, "-o", tmp_path / "ann-out");
+    run_degenotate("-a", annotation, "-g", genome, "-o", tmp_path / "cds-out", "-c", tmp_path / "cds.fa");
+    run_degenotate("-s", tmp_path / "cds.fa", "--cds-coords", tmp_path / "cds.fa.coords.tsv", "-o", tmp_path / "coords-out");
+
+    with open(tmp_path / "cds.fa.coords.tsv") as coords_file:
+        frames = { line.split("\t")[0] : line.split("\t")[3] for line in coords_file if not line.startswith("#") };
+    assert frames == { "t1" : "1", "t2" : "2" };
+    # Both transcripts have leading bases out of frame
+
+    ann_bed = readBed(tmp_path / "ann-out" / "degeneracy-all-sites.bed");
+    coords_bed = readBed(tmp_path / "coords-out" / "degeneracy-all-sites.bed");
+
+    assert coords_bed;
+    assert set(coords_bed) <= set(ann_bed);
+    assert [ line for line in ann_bed if line.split("\t")[4] != "." ] == [ line for line in coords_bed if line.split("\t")[4] != "." ];
+    # Every site from the CDS is in the annotation output, and the sites with a degeneracy are the same in both
+
+#############################################################################
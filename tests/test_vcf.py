@@ -0,0 +1,98 @@
+#############################################################################
+# Tests for the MK tests and haplotypes from a VCF file (-v)
+#############################################################################
+
+import random
+
+import pytest
+
+from conftest import writeGenome, writeGFF
+
+pysam = pytest.importorskip("pysam");
+
+COMPLEMENT = str.maketrans("ACGT", "TGCA");
+
+#############################################################################
+
+def writeVCF(filename, records, samples=("in1", "in2", "out1")):
+# Writes a bgzipped and indexed VCF file from a list of (<position>, <ref>, <alt>, <genotypes>) tuples on chr1
+
+    with open(filename, "w") as vcf_file:
+        vcf_file.write("##fileformat=VCFv4.2\n##contig=<ID=chr1,length=1000>\n");
+        vcf_file.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n');
+        vcf_file.write("\t".join(["#CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER", "INFO", "FORMAT"] + list(samples)) + "\n");
+        for pos, ref, alt, genotypes in records:
+            vcf_file.write("\t".join(["chr1", str(pos), ".", ref, alt, ".", "PASS", ".", "GT"] + list(genotypes)) + "\n");
+
+    pysam.tabix_index(str(filename), preset="vcf", force=True);
+    return str(filename) + ".gz";
+
+#############################################################################
+
+def readMK(filename):
+# Reads the MK output into a dict of { <transcript> : { <column> : <value> } }
+
+    with open(filename) as mk_file:
+        cols = mk_file.readline().rstrip("\n").split("\t");
+        return { line.split("\t")[0] : dict(zip(cols, line.rstrip("\n").split("\t"))) for line in mk_file };
+
+#############################################################################
+
+def test_mk_minus_strand_partial_codons(tmp_path, run_degenotate):
+# On the negative strand, a variant should be placed in the CDS after the leading bases out of frame, not the trailing
+# ones, for both the MK tests and the haplotypes. The CDS below has 2 leading and 1 trailing bases, and the variant is
+# a fixed difference at the third position of GCT (Ala, synonymous). One base off, it would be the first position of
+# TGG (Trp, nonsynonymous).
+
+    cds = "GA" + "GCT" + "TGG" + "AAA" * 5 + "C";
+    random.seed(3);
+    seq = "".join(random.choice("ACGT") for i in range(100)) + cds[::-1].translate(COMPLEMENT) + "".join(random.choice("ACGT") for i in range(100));
+    writeGenome(tmp_path / "genome.fa", seq);
+    # The CDS is on the negative strand from 101 to 124
+
+    writeGFF(tmp_path / "ann.gff3", [
+        ("mRNA", 101, 124, "-", ".", "ID=t1;Parent=g1"),
+        ("CDS", 101, 124, "-", "2", "Parent=t1"),
+    ]);
+
+    vcf = writeVCF(tmp_path / "test.vcf", [ (120, "A", "G", ("0|0", "0|0", "1|1")) ]);
+    # The T of GCT at CDS position 4 is at 124 - 4 = 120 in the genome, where the reference is its complement
+
+    run_degenotate("-a", tmp_path / "ann.gff3", "-g", tmp_path / "genome.fa", "-v", vcf, "-u", "out1", "--haplotypes", "-o", tmp_path / "out");
+
+    mk = readMK(tmp_path / "out" / "mk.tsv");
+    assert (float(mk['t1']['dN']), float(mk['t1']['dS'])) == (0, 1);
+
+    with open(tmp_path / "out" / "haplotype-cds.fa") as hap_file:
+        hap_seqs = dict(zip(*[iter(hap_file.read().split())] * 2));
+    assert hap_seqs[">t1|out1|1"] == hap_seqs[">t1|out1|2"] == "GCC" + "TGG" + "AAA" * 5;
+    assert hap_seqs[">t1|in1|1"] == "GCT" + "TGG" + "AAA" * 5;
+    # The haplotypes have the variant at the same position in the CDS
+
+#############################################################################
+
+def test_mk_variant_at_first_base(tmp_path, run_degenotate):
+# A variant at the first base of a transcript should be read from the VCF, both with the annotation and with CDS
+# read with -s --cds-coords. Here it is a fixed difference at the first position of TGG (Trp, nonsynonymous).
+
+    cds = "TGG" + "AAA" * 5;
+    random.seed(5);
+    seq = "".join(random.choice("ACGT") for i in range(100)) + cds + "".join(random.choice("ACGT") for i in range(100));
+    writeGenome(tmp_path / "genome.fa", seq);
+
+    writeGFF(tmp_path / "ann.gff3", [
+        ("mRNA", 101, 118, "+", ".", "ID=t1;Parent=g1"),
+        ("CDS", 101, 118, "+", "0", "Parent=t1"),
+    ]);
+
+    vcf = writeVCF(tmp_path / "test.vcf", [ (101, "T", "C", ("0/0", "0/0", "1/1")) ]);
+
+    run_degenotate("-a", tmp_path / "ann.gff3", "-g", tmp_path / "genome.fa", "-o", tmp_path / "cds-out", "-c", tmp_path / "cds.fa");
+    run_degenotate("-a", tmp_path / "ann.gff3", "-g", tmp_path / "genome.fa", "-v", vcf, "-u", "out1", "-o", tmp_path / "ann-out");
+    run_degenotate("-s", tmp_path / "cds.fa", "--cds-coords", tmp_path / "cds.fa.coords.tsv", "-v", vcf, "-u", "out1", "-o", tmp_path / "coords-out");
+
+    for outdir in ["ann-out", "coords-out"]:
+        mk = readMK(tmp_path / outdir / "mk.tsv");
+        assert (float(mk['t1']['dN']), float(mk['t1']['dS'])) == (1, 0);
+
+#############################################################################